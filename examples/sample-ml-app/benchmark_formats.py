@@ -0,0 +1,119 @@
+"""
+Benchmark the dataset output formats supported by data_generator.py
+
+For each row count and format this measures generation + write time, file
+size and full read time (the way preprocess_data loads its input).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from data_generator import OUTPUT_FORMATS, generate_sample_data_streaming, read_dataset
+
+def benchmark_format(n_rows, output_format, work_dir, n_features=20, chunk_size=500_000):
+    """Benchmark writing and reading one dataset in one format"""
+    output_file = os.path.join(work_dir, f"bench_{n_rows}{OUTPUT_FORMATS[output_format]}")
+
+    start = time.perf_counter()
+    generate_sample_data_streaming(
+        n_samples=n_rows,
+        n_features=n_features,
+        output_file=output_file,
+        chunk_size=min(chunk_size, n_rows),
+        output_format=output_format
+    )
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = read_dataset(output_file)
+    read_seconds = time.perf_counter() - start
+
+    result = {
+        'rows': n_rows,
+        'features': n_features,
+        'format': output_format,
+        'write_seconds': round(write_seconds, 3),
+        'read_seconds': round(read_seconds, 3),
+        'file_mb': round(os.path.getsize(output_file) / 1024 / 1024, 2),
+        'memory_mb': round(df.memory_usage(deep=True).sum() / 1024 / 1024, 2)
+    }
+
+    os.remove(output_file)
+    return result
+
+def run_benchmarks(row_counts, formats, n_features=20, work_dir=None):
+    """Run benchmark_format over every row count / format combination"""
+    cleanup = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="format-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = []
+    try:
+        for n_rows in row_counts:
+            for output_format in formats:
+                results.append(benchmark_format(n_rows, output_format, work_dir, n_features))
+    finally:
+        if cleanup:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+def print_results(results):
+    """Print benchmark results as a table, with read speedup relative to CSV"""
+    csv_read = {r['rows']: r['read_seconds'] for r in results if r['format'] == 'csv'}
+
+    print("\n=== Format Benchmark ===")
+    print(f"{'rows':>10} {'format':>8} {'write s':>9} {'read s':>8} {'file MB':>9} {'mem MB':>8} {'read x':>7}")
+    for r in results:
+        baseline = csv_read.get(r['rows'])
+        speedup = f"{baseline / r['read_seconds']:.1f}" if baseline and r['read_seconds'] else "-"
+        print(f"{r['rows']:>10} {r['format']:>8} {r['write_seconds']:>9.2f} {r['read_seconds']:>8.2f} "
+              f"{r['file_mb']:>9.1f} {r['memory_mb']:>8.1f} {speedup:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dataset output formats")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10_000, 1_000_000, 10_000_000],
+        help="Row counts to benchmark"
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=list(OUTPUT_FORMATS),
+        default=list(OUTPUT_FORMATS),
+        help="Formats to benchmark"
+    )
+    parser.add_argument(
+        "--features",
+        type=int,
+        default=20,
+        help="Number of features per row"
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="Directory for the temporary benchmark files (default: a temp dir)"
+    )
+    parser.add_argument(
+        "--output",
+        help="Write results as JSON to this file"
+    )
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.rows, args.formats, args.features, args.work_dir)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Benchmark suite for the sample ML pipeline hot paths
+
+Drives generate_sample_data, generate_time_series_data and the preprocess_data,
+train_model and validate_model component functions across a matrix of row
+counts, feature counts and algorithms. Each benchmark records wall time,
+throughput (rows/sec) and peak RSS. Results are stored as JSON and can be
+compared against a stored baseline to flag regressions.
+
+Every (rows, features) case runs in a fresh worker process so peak memory is
+not inflated by earlier cases; within a case, peak RSS is measured per stage.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+DEFAULT_FEATURES = [10, 50]
+DEFAULT_ALGORITHMS = ["random_forest", "logistic_regression", "sgd"]
+
+# Relative slowdown / memory growth over the baseline that counts as a regression
+DEFAULT_TIME_TOLERANCE = 0.20
+DEFAULT_MEMORY_TOLERANCE = 0.20
+
+def _result(benchmark, n_rows, n_features, algorithm, phase):
+    """Turn one recorded phase into a benchmark result"""
+    return {
+        'benchmark': benchmark,
+        'rows': n_rows,
+        'features': n_features,
+        'algorithm': algorithm,
+        'seconds': phase['wall_seconds'],
+        'rows_per_sec': round(n_rows / phase['wall_seconds'], 1) if phase['wall_seconds'] else None,
+        'peak_rss_mb': phase['peak_rss_mb']
+    }
+
+def _run_case(n_rows, n_features, algorithms, work_dir, include_time_series=True):
+    """Run every benchmark for one (rows, features) combination; executed in a worker process"""
+    from data_generator import generate_sample_data, generate_time_series_data
+    from instrumentation import PhaseRecorder
+    from local_runner import LocalArtifact
+    import components
+
+    case_dir = os.path.join(work_dir, f"rows{n_rows}_features{n_features}")
+    os.makedirs(case_dir, exist_ok=True)
+    # Component uploads go to the local filesystem instead of GCS
+    os.environ['LOCAL_GCS_ROOT'] = os.path.join(case_dir, 'gcs')
+
+    def artifact(name):
+        return LocalArtifact(os.path.join(case_dir, name))
+
+    recorder = PhaseRecorder('benchmark', log=False)
+    results = []
+
+    data_file = os.path.join(case_dir, 'data.csv')
+    with recorder.phase('generate_sample_data'):
+        generate_sample_data(n_samples=n_rows, n_features=n_features, output_file=data_file)
+    results.append(_result('generate_sample_data', n_rows, n_features, None,
+                           recorder.phases['generate_sample_data']))
+
+    if include_time_series:
+        with recorder.phase('generate_time_series_data'):
+            generate_time_series_data(n_samples=n_rows, output_file=os.path.join(case_dir, 'ts.csv'))
+        results.append(_result('generate_time_series_data', n_rows, None, None,
+                               recorder.phases['generate_time_series_data']))
+
+    processed = artifact('processed_data')
+    with recorder.phase('preprocess_data'):
+        components.preprocess_data.python_func(
+            input_data=LocalArtifact(data_file),
+            processed_data=processed,
+            performance=artifact('preprocess_performance'),
+            bucket_name='benchmark'
+        )
+    results.append(_result('preprocess_data', n_rows, n_features, None,
+                           recorder.phases['preprocess_data']))
+
+    for algorithm in algorithms:
+        model = artifact(f'model_{algorithm}')
+        metrics = artifact(f'metrics_{algorithm}')
+        with recorder.phase(f'train_model[{algorithm}]'):
+            components.train_model.python_func(
+                processed_data=processed,
+                model=model,
+                metrics=metrics,
+                performance=artifact(f'train_performance_{algorithm}'),
+                bucket_name='benchmark',
+                algorithm=algorithm
+            )
+        results.append(_result('train_model', n_rows, n_features, algorithm,
+                               recorder.phases[f'train_model[{algorithm}]']))
+
+        with recorder.phase(f'validate_model[{algorithm}]'):
+            components.validate_model.python_func(
+                model=model,
+                metrics=metrics,
+                processed_data=processed,
+                validation=artifact(f'validation_{algorithm}'),
+                performance=artifact(f'validate_performance_{algorithm}'),
+                accuracy_threshold=0.0
+            )
+        results.append(_result('validate_model', n_rows, n_features, algorithm,
+                               recorder.phases[f'validate_model[{algorithm}]']))
+
+    shutil.rmtree(case_dir, ignore_errors=True)
+    return results
+
+def _key(result):
+    return (result['benchmark'], result['rows'], result['features'], result['algorithm'])
+
+def run_suite(row_counts=DEFAULT_ROWS, feature_counts=DEFAULT_FEATURES, algorithms=DEFAULT_ALGORITHMS,
+              repeat=1, work_dir=None):
+    """
+    Run the benchmark matrix
+
+    Args:
+        row_counts: Dataset sizes to benchmark
+        feature_counts: Feature counts to benchmark (at least 10)
+        algorithms: Training algorithms to benchmark
+        repeat: Run every case this many times and keep the fastest result
+        work_dir: Directory for temporary files (default: a temp dir)
+
+    Returns:
+        List of result dicts (benchmark, rows, features, algorithm, seconds,
+        rows_per_sec, peak_rss_mb)
+    """
+    cleanup = work_dir is None
+    work_dir = os.path.abspath(work_dir or tempfile.mkdtemp(prefix="pipeline-bench-"))
+    os.makedirs(work_dir, exist_ok=True)
+
+    best = {}
+    try:
+        for _ in range(repeat):
+            for n_rows in row_counts:
+                for i, n_features in enumerate(feature_counts):
+                    # A fresh process per case keeps peak RSS independent of earlier cases
+                    with ProcessPoolExecutor(max_workers=1) as pool:
+                        results = pool.submit(
+                            _run_case, n_rows, n_features, algorithms, work_dir,
+                            include_time_series=(i == 0)
+                        ).result()
+                    for result in results:
+                        previous = best.get(_key(result))
+                        if previous is None or result['seconds'] < previous['seconds']:
+                            best[_key(result)] = result
+    finally:
+        if cleanup:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return list(best.values())
+
+def compare_to_baseline(results, baseline, time_tolerance=DEFAULT_TIME_TOLERANCE,
+                        memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    """
+    Compare results against baseline results
+
+    Args:
+        results: Results of the current run
+        baseline: Results of the baseline run
+        time_tolerance: Allowed relative increase in wall time
+        memory_tolerance: Allowed relative increase in peak RSS
+
+    Returns:
+        List of regressions (result key, measure, baseline value, current value)
+    """
+    baseline_by_key = {_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline_by_key.get(_key(result))
+        if reference is None:
+            continue
+        for measure, tolerance in (('seconds', time_tolerance), ('peak_rss_mb', memory_tolerance)):
+            if result[measure] > reference[measure] * (1 + tolerance):
+                regressions.append({
+                    'benchmark': result['benchmark'],
+                    'rows': result['rows'],
+                    'features': result['features'],
+                    'algorithm': result['algorithm'],
+                    'measure': measure,
+                    'baseline': reference[measure],
+                    'current': result[measure],
+                    'change': round(result[measure] / reference[measure] - 1, 3) if reference[measure] else None
+                })
+    return regressions
+
+def print_results(results, regressions=()):
+    """Print results as a table, marking regressed measurements"""
+    regressed = {(_key(r), r['measure']) for r in regressions}
+
+    print("\n=== Pipeline Benchmark ===")
+    print(f"{'benchmark':<26} {'rows':>10} {'feat':>5} {'algorithm':<20} {'wall s':>9} {'rows/s':>12} {'peak MB':>9}")
+    for r in results:
+        seconds_flag = "!" if (_key(r), 'seconds') in regressed else " "
+        memory_flag = "!" if (_key(r), 'peak_rss_mb') in regressed else " "
+        rows_per_sec = f"{r['rows_per_sec']:.0f}" if r['rows_per_sec'] else "-"
+        print(f"{r['benchmark']:<26} {r['rows']:>10} {r['features'] or '-':>5} {r['algorithm'] or '-':<20} "
+              f"{r['seconds']:>8.2f}{seconds_flag} {rows_per_sec:>12} {r['peak_rss_mb']:>8.1f}{memory_flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against the baseline:")
+        for r in regressions:
+            print(f"  {r['benchmark']} rows={r['rows']} features={r['features']} algorithm={r['algorithm']}: "
+                  f"{r['measure']} {r['baseline']} -> {r['current']} (+{r['change']:.0%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sample ML pipeline hot paths")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=DEFAULT_ROWS,
+        help="Row counts to benchmark"
+    )
+    parser.add_argument(
+        "--features",
+        type=int,
+        nargs="+",
+        default=DEFAULT_FEATURES,
+        help="Feature counts to benchmark (at least 10)"
+    )
+    parser.add_argument(
+        "--algorithms",
+        nargs="+",
+        default=DEFAULT_ALGORITHMS,
+        help="Training algorithms to benchmark"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Run each case this many times and keep the fastest"
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="Directory for the temporary benchmark files (default: a temp dir)"
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmark_results.json",
+        help="Write results as JSON to this file"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Baseline results JSON to compare against"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Also write the results to --baseline"
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=DEFAULT_TIME_TOLERANCE,
+        help="Allowed relative wall time increase before flagging a regression"
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=DEFAULT_MEMORY_TOLERANCE,
+        help="Allowed relative peak memory increase before flagging a regression"
+    )
+
+    args = parser.parse_args()
+
+    if min(args.features) < 10:
+        parser.error("--features must be at least 10 (8 informative + 2 redundant features)")
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline requires --baseline")
+
+    results = run_suite(args.rows, args.features, args.algorithms, args.repeat, args.work_dir)
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare_to_baseline(results, baseline, args.time_tolerance, args.memory_tolerance)
+
+    print_results(results, regressions)
+
+    report = {'results': results, 'regressions': regressions}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.save_baseline and args.baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
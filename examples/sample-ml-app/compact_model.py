@@ -0,0 +1,341 @@
+"""
+Compact, array-backed model export for serving
+
+A fitted RandomForestClassifier (or a single DecisionTreeClassifier) is
+flattened into a handful of NumPy arrays holding every node of every tree:
+split feature, float32 threshold, child indices and normalized leaf class
+probabilities. Linear models (LogisticRegression, SGDClassifier) are reduced to
+their coefficients and intercepts. The arrays are stored as an uncompressed
+.npz, which loads much faster than unpickling the estimator and needs neither
+scikit-learn nor joblib at serving time; CompactModel predicts with NumPy only.
+
+Thresholds are rounded down to float32, so for float32 inputs (which is what
+preprocess_data writes and what scikit-learn trees compare internally) every
+split decision is unchanged.
+
+Given the StandardScaler parameters from preprocessing.json, the scaling can be
+folded into the model to produce a bundle that predicts directly on raw
+features: split thresholds become ``t * scale + mean`` (kept in float64) and
+linear coefficients become ``coef / scale`` with the intercept shifted by
+``coef . (mean / scale)``. Serving then makes one vectorized pass per batch and
+cannot drift from the training-time scaling. The bundle also carries the
+imputation and categorical encoding fitted by preprocess_data (fill values,
+missing-indicator columns, category lists), so it accepts raw rows with
+missing values and string categories. Tree traversal is vectorized across rows and
+trees; it is fastest for the small batches of online serving, while very large
+offline batches are still faster with the scikit-learn estimator.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+def _export_trees(trees, classes, mean=None, scale=None):
+    """Concatenate the nodes of fitted decision trees into flat arrays"""
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        t = tree.tree_
+        is_leaf = t.children_left < 0
+        roots.append(offset)
+        feature.append(np.where(is_leaf, -1, t.feature))
+        if scale is not None:
+            # (x - mean) / scale <= t  <=>  x <= t * scale + mean
+            split_feature = np.maximum(t.feature, 0)
+            threshold.append(np.where(is_leaf, 0.0, t.threshold * scale[split_feature] + mean[split_feature]))
+        else:
+            # Largest float32 not above the float64 threshold: x32 <= t64 <=> x32 <= t32
+            t32 = t.threshold.astype(np.float32)
+            threshold.append(np.where(t32.astype(np.float64) > t.threshold,
+                                      np.nextafter(t32, np.float32(-np.inf)), t32))
+        left.append(np.where(is_leaf, 0, t.children_left) + offset)
+        right.append(np.where(is_leaf, 0, t.children_right) + offset)
+        leaf_value = t.value[:, 0, :]
+        value.append(leaf_value / leaf_value.sum(axis=1, keepdims=True))
+        max_depth = max(max_depth, t.max_depth)
+        offset += t.node_count
+
+    index_dtype = np.int32 if offset < 2 ** 31 else np.int64
+    return {
+        'kind': np.array('tree_ensemble'),
+        'classes': np.asarray(classes),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float32 if scale is None else np.float64),
+        'left': np.concatenate(left).astype(index_dtype),
+        'right': np.concatenate(right).astype(index_dtype),
+        'value': np.concatenate(value).astype(np.float32),
+        'roots': np.array(roots, dtype=index_dtype),
+        'max_depth': np.array(max_depth)
+    }
+
+def _export_transform(transform):
+    """Arrays reproducing preprocess_data's imputation and categorical encoding"""
+    inputs = transform['input_features']
+    numeric = transform['numeric_features']
+    categories = [transform['categories'][c] for c in transform['categorical_features']]
+    return {
+        'input_features': np.array(inputs),
+        'numeric_index': np.array([inputs.index(c) for c in numeric], dtype=np.int64),
+        'fill': np.asarray(transform['fill_values'], dtype=np.float32),
+        'indicator_index': np.array([numeric.index(c) for c in transform['indicator_features']], dtype=np.int64),
+        'categorical_index': np.array([inputs.index(c) for c in transform['categorical_features']], dtype=np.int64),
+        'categories': np.array([value for values in categories for value in values], dtype=str),
+        'category_offsets': np.cumsum([0] + [len(values) for values in categories]),
+        'categorical_encoding': np.array(transform['categorical_encoding'])
+    }
+
+def export_arrays(model, scaler=None, feature_names=None, transform=None):
+    """
+    Flatten a fitted classifier into a dict of NumPy arrays
+
+    Args:
+        model: A fitted RandomForestClassifier, DecisionTreeClassifier,
+            LogisticRegression or SGDClassifier
+        scaler: Optional {'mean': [...], 'scale': [...]} of the StandardScaler the
+            model was trained behind; it is folded in so the arrays take raw features
+        feature_names: Optional input feature names, stored with the arrays
+        transform: Optional 'transform' section of preprocessing.json (requires
+            scaler); the arrays then take the untransformed input columns
+
+    Returns:
+        Dict of arrays accepted by CompactModel
+    """
+    mean = scale = None
+    if scaler is not None:
+        mean = np.asarray(scaler['mean'], dtype=np.float64)
+        scale = np.asarray(scaler['scale'], dtype=np.float64)
+
+    if hasattr(model, 'estimators_') and all(hasattr(e, 'tree_') for e in model.estimators_):
+        arrays = _export_trees(model.estimators_, model.classes_, mean, scale)
+    elif hasattr(model, 'tree_'):
+        arrays = _export_trees([model], model.classes_, mean, scale)
+    elif hasattr(model, 'coef_'):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        intercept = np.asarray(model.intercept_, dtype=np.float64)
+        if scale is not None:
+            coef = coef / scale
+            intercept = intercept - coef @ mean
+        arrays = {
+            'kind': np.array('linear'),
+            'classes': np.asarray(model.classes_),
+            'coef': coef,
+            'intercept': intercept
+        }
+    else:
+        raise TypeError(f"Cannot export {type(model).__name__} to a compact model")
+
+    arrays['input'] = np.array('scaled' if scale is None else 'raw')
+    if feature_names is not None:
+        arrays['feature_names'] = np.array(feature_names)
+    if transform is not None:
+        if scale is None:
+            raise ValueError("transform requires the scaler it was fitted with")
+        arrays.update(_export_transform(transform))
+    return arrays
+
+def raw_features(X, preprocessing):
+    """
+    Undo preprocess_data's scaling and transform on processed rows
+
+    Missing-indicator columns turn back into missing values and encoded
+    categories back into their strings, giving rows a bundle accepts.
+
+    Args:
+        X: Scaled feature matrix (e.g. X_test.npy)
+        preprocessing: Parsed preprocessing.json
+
+    Returns:
+        Float matrix of the input columns, or an object matrix if some are categorical
+    """
+    unscaled = np.asarray(X) * np.asarray(preprocessing['scaler']['scale']) + np.asarray(preprocessing['scaler']['mean'])
+    transform = preprocessing.get('transform')
+    if transform is None:
+        return unscaled
+
+    numeric = transform['numeric_features']
+    values = unscaled[:, :len(numeric)].copy()
+    indicator_start = unscaled.shape[1] - len(transform['indicator_features'])
+    for j, name in enumerate(transform['indicator_features']):
+        values[unscaled[:, indicator_start + j] > 0.5, numeric.index(name)] = np.nan
+    if not transform['categorical_features']:
+        return values
+
+    inputs = transform['input_features']
+    raw = np.empty((len(unscaled), len(inputs)), dtype=object)
+    for i, name in enumerate(numeric):
+        raw[:, inputs.index(name)] = values[:, i]
+    column = len(numeric)
+    for name in transform['categorical_features']:
+        categories = np.array(transform['categories'][name] + [None], dtype=object)
+        if transform['categorical_encoding'] == 'onehot':
+            block = unscaled[:, column:column + len(categories) - 1]
+            codes = np.where(block.max(axis=1, initial=0.0) > 0.5, np.argmax(block, axis=1) if block.shape[1] else 0, -1)
+            column += len(categories) - 1
+        else:
+            codes = np.rint(unscaled[:, column]).astype(np.int64)
+            column += 1
+        raw[:, inputs.index(name)] = categories[codes]
+    return raw
+
+class CompactModel:
+    """NumPy-only predictor for arrays produced by export_arrays"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.kind = str(arrays['kind'])
+        self.classes_ = arrays['classes']
+        self.feature_names = arrays['feature_names'].tolist() if 'feature_names' in arrays else None
+
+    def _leaf_values(self, X):
+        a = self.arrays
+        n_trees = len(a['roots'])
+        # One cursor per (row, tree), all advanced one level per iteration;
+        # cursors that reach a leaf drop out of the active set
+        node = np.tile(a['roots'], len(X))
+        row = np.repeat(np.arange(len(X)), n_trees)
+        active = np.arange(len(node))
+        for _ in range(int(a['max_depth'])):
+            current = node[active]
+            feature = a['feature'][current]
+            internal = feature >= 0
+            active, current, feature = active[internal], current[internal], feature[internal]
+            if not len(active):
+                break
+            go_left = X[row[active], feature] <= a['threshold'][current]
+            node[active] = np.where(go_left, a['left'][current], a['right'][current])
+        return a['value'][node].reshape(len(X), n_trees, -1)
+
+    def _as_matrix(self, X, dtype):
+        if 'fill' in self.arrays:
+            return self._transform(X).astype(dtype, copy=False)
+        # DataFrames are reordered to the training feature order when it is known
+        if self.feature_names is not None and hasattr(X, 'columns'):
+            X = X[self.feature_names]
+        return np.asarray(X, dtype=dtype)
+
+    def _transform(self, X):
+        # Same imputation, encoding and indicator layout as preprocess_data
+        a = self.arrays
+        if hasattr(X, 'columns'):
+            columns = [X[name].to_numpy() for name in a['input_features']]
+        else:
+            X = np.asarray(X, dtype=object if len(a['categorical_index']) else np.float32)
+            columns = [X[:, i] for i in range(X.shape[1])]
+
+        numeric = np.empty((len(columns[0]) if columns else 0, len(a['numeric_index'])), dtype=np.float32)
+        for j, i in enumerate(a['numeric_index']):
+            numeric[:, j] = np.asarray(columns[i], dtype=np.float32)
+        mask = np.isnan(numeric)
+        parts = [np.where(mask, a['fill'], numeric)]
+        for k, i in enumerate(a['categorical_index']):
+            categories = a['categories'][a['category_offsets'][k]:a['category_offsets'][k + 1]]
+            values = np.asarray(columns[i]).astype(str)
+            # Categories are sorted; missing and unseen values get code -1
+            position = np.minimum(np.searchsorted(categories, values), max(len(categories) - 1, 0))
+            codes = np.where(categories[position] == values, position, -1) if len(categories) else np.full(len(values), -1)
+            if str(a['categorical_encoding']) == 'onehot':
+                parts.append(codes[:, None] == np.arange(len(categories)))
+            else:
+                parts.append(codes[:, None])
+        parts.append(mask[:, a['indicator_index']])
+        return np.hstack([part.astype(np.float32) for part in parts])
+
+    def predict_proba(self, X):
+        """Class probabilities (tree ensembles only)"""
+        if self.kind != 'tree_ensemble':
+            raise ValueError("predict_proba is only available for tree ensembles")
+        X = self._as_matrix(X, self.arrays['threshold'].dtype)
+        return self._leaf_values(X).mean(axis=1)
+
+    def decision_function(self, X):
+        """Linear decision function (linear models only)"""
+        if self.kind != 'linear':
+            raise ValueError("decision_function is only available for linear models")
+        scores = self._as_matrix(X, np.float64) @ self.arrays['coef'].T + self.arrays['intercept']
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, X):
+        if self.kind == 'tree_ensemble':
+            return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[np.argmax(scores, axis=1)]
+
+def save(path, arrays):
+    """Write exported arrays to an uncompressed .npz file"""
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+def load(path):
+    """Load a CompactModel from a .npz file written by save"""
+    with np.load(path, allow_pickle=False) as data:
+        return CompactModel({name: data[name] for name in data.files})
+
+def prediction_match_rate(model, compact, X, X_compact=None, batch_size=100_000):
+    """
+    Fraction of rows on which the original model and the compact model agree
+
+    Args:
+        model: The original estimator, predicting on X
+        compact: The CompactModel, predicting on X_compact (default: X), e.g. the
+            unscaled rows for a bundle with the scaler folded in
+        batch_size: Rows predicted at a time
+    """
+    X_compact = X if X_compact is None else X_compact
+    matches = 0
+    for start in range(0, len(X), batch_size):
+        end = start + batch_size
+        matches += int(np.sum(model.predict(X[start:end]) == compact.predict(X_compact[start:end])))
+    return matches / len(X) if len(X) else 1.0
+
+def main():
+    import joblib
+    import os
+
+    parser = argparse.ArgumentParser(description="Export a joblib model to a compact .npz model")
+    parser.add_argument("model_file", help="joblib-serialized scikit-learn classifier")
+    parser.add_argument("output_file", help="Destination .npz file")
+    parser.add_argument("--check-data", help=".npy feature matrix to verify predictions on (e.g. X_test.npy)")
+    parser.add_argument(
+        "--preprocessing",
+        help="preprocessing.json of the training data; folds the scaler in so the model takes raw features"
+    )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = joblib.load(args.model_file)
+    joblib_load_seconds = time.perf_counter() - start
+
+    scaler = feature_names = transform = None
+    if args.preprocessing:
+        import json
+        with open(args.preprocessing) as f:
+            preprocessing = json.load(f)
+        scaler, feature_names = preprocessing['scaler'], preprocessing['feature_names']
+        transform = preprocessing.get('transform')
+
+    save(args.output_file, export_arrays(model, scaler, feature_names, transform))
+
+    start = time.perf_counter()
+    compact = load(args.output_file)
+    compact_load_seconds = time.perf_counter() - start
+
+    print(f"joblib model:  {os.path.getsize(args.model_file) / 1024 / 1024:8.2f} MiB, "
+          f"loads in {joblib_load_seconds:.3f}s")
+    print(f"compact model: {os.path.getsize(args.output_file) / 1024 / 1024:8.2f} MiB, "
+          f"loads in {compact_load_seconds:.3f}s")
+
+    if args.check_data:
+        X = np.load(args.check_data, mmap_mode='r')
+        X_compact = X
+        if scaler is not None:
+            # The check data is processed; undo that for the raw-feature bundle
+            X_compact = raw_features(X, preprocessing)
+        print(f"Prediction match rate: {prediction_match_rate(model, compact, X, X_compact):.6f}")
+
+if __name__ == "__main__":
+    main()
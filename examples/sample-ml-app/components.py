@@ -0,0 +1,1493 @@
+"""
+Components of the sample ML pipeline
+
+Every component is a containerized Python component: it runs from
+COMPONENT_IMAGE, which holds this module together with the helper modules the
+components import (instrumentation for per-phase metrics, step_cache,
+gcs_transfer for uploads and compact_model for the serving export). Build and
+push the image whenever the components or those helpers change:
+
+    kfp component build . --component-filepattern components.py --push-image
+
+pipeline.py wires the components into the pipeline; local_runner.py calls
+their python functions directly.
+"""
+
+import os
+from typing import NamedTuple
+
+from kfp.dsl import component, Input, Output, Dataset, Model, Metrics
+
+# Image built from this directory by `kfp component build`
+COMPONENT_IMAGE = os.environ.get("COMPONENT_IMAGE", "gcr.io/your-project/sample-ml-components:latest")
+
+# Component for data preprocessing
+@component(
+    base_image="python:3.9",
+    target_image=COMPONENT_IMAGE,
+    packages_to_install=[
+        "pandas==2.1.3",
+        "scikit-learn==1.3.2",
+        "numpy==1.25.2",
+        "pyarrow==14.0.1",
+        "google-cloud-storage==2.14.0"
+    ]
+)
+def preprocess_data(
+    input_data: Input[Dataset],
+    processed_data: Output[Dataset],
+    performance: Output[Metrics],
+    bucket_name: str,
+    test_size: float = 0.2,
+    streaming: bool = False,
+    chunk_size: int = 100000,
+    cache_uri: str = "",
+    imputation: str = "median",
+    missing_indicators: bool = True,
+    categorical_encoding: str = "onehot"
+) -> NamedTuple('PreprocessOutput', [('samples', int), ('features', int)]):
+    """
+    Preprocess the input data for machine learning
+    
+    With ``streaming`` enabled the input is read ``chunk_size`` rows at a time in
+    two passes (scaler ``partial_fit``, then scale-and-write), and each row is
+    assigned to train or test by a hash of its contents, so memory use stays
+    constant in the dataset size.
+    
+    Missing values are imputed instead of dropping rows: ``imputation`` is
+    ``median`` or ``mean`` (fitted on the training rows; ``drop`` keeps the old
+    dropna behavior). With ``missing_indicators`` a 0/1 ``<column>_missing``
+    feature is appended for every column that had missing training values.
+    Non-numeric columns are encoded as ``onehot`` or ``ordinal`` codes per
+    ``categorical_encoding``. The fitted transform is saved in
+    preprocessing.json next to the scaler and applied as one vectorized pass
+    into a float32 matrix; integer labels are stored in the smallest dtype
+    that holds them.
+    
+    ``input_data`` is a single data file, or a shard manifest whose shards are
+    read in order as one dataset: one written by gcs_transfer.upload_dataset,
+    whose shards are gs:// URIs downloaded before reading, or a data_generator
+    shard directory, whose shards are paths relative to its manifest.json.
+    
+    If ``cache_uri`` is set, a previous run's outputs for identical input data and
+    parameters are restored from the cache instead of recomputing them.
+    
+    ``performance`` reports reading, transforming and writing the data as
+    separate phases (``fit_transform``, ``transform_write`` and ``scale`` when
+    streaming), next to fetching shards, uploading and the cache lookup.
+    """
+    
+    import pandas as pd
+    import numpy as np
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from collections import namedtuple
+    from pandas.api.types import is_numeric_dtype
+    import json
+    import os
+    import tempfile
+    from instrumentation import PhaseRecorder
+    from step_cache import StepCache
+    from gcs_transfer import download_files, upload_files
+    
+    PreprocessOutput = namedtuple('PreprocessOutput', ['samples', 'features'])
+    
+    perf = PhaseRecorder('preprocess_data')
+    
+    if imputation not in ('median', 'mean', 'drop'):
+        raise ValueError(f"Unknown imputation {imputation!r}; use 'median', 'mean' or 'drop'")
+    if categorical_encoding not in ('onehot', 'ordinal'):
+        raise ValueError(f"Unknown categorical_encoding {categorical_encoding!r}; use 'onehot' or 'ordinal'")
+    
+    if cache_uri:
+        perf.start('cache_lookup')
+        cache = StepCache(
+            cache_uri, 'preprocess_data',
+            {'test_size': test_size, 'streaming': streaming, 'chunk_size': chunk_size,
+             'imputation': imputation, 'missing_indicators': missing_indicators,
+             'categorical_encoding': categorical_encoding, 'cache_version': 2},
+            [input_data.path]
+        )
+        cached = cache.load({'processed_data': processed_data.path})
+        if cached is not None:
+            print(f"Cache hit for preprocess_data ({cache.key}), reusing previous outputs")
+            perf.write(performance)
+            return PreprocessOutput(cached['samples'], cached['features'])
+    
+    # Accumulates what the feature transform needs from the training rows: column
+    # kinds, missing counts, sums (mean imputation), a bounded row sample keeping
+    # the rows with the smallest content hashes (median imputation) and categories
+    class TransformFitter:
+        def __init__(self, sample_size=None):
+            self.sample_size = sample_size
+            self.input_features = None
+        
+        def update(self, X, hashes=None):
+            if self.input_features is None:
+                self.input_features = X.columns.tolist()
+                self.categorical = [c for c in self.input_features if not is_numeric_dtype(X[c])]
+                self.numeric = [c for c in self.input_features if c not in self.categorical]
+                self.missing = np.zeros(len(self.numeric), dtype=np.int64)
+                self.observed = np.zeros(len(self.numeric), dtype=np.int64)
+                self.total = np.zeros(len(self.numeric))
+                self.sample = np.empty((0, len(self.numeric)))
+                self.sample_hashes = np.empty(0, dtype=np.uint64)
+                self.categories = {c: set() for c in self.categorical}
+            values = X[self.numeric].to_numpy(dtype=np.float64)
+            mask = np.isnan(values)
+            self.missing += mask.sum(axis=0)
+            self.observed += len(values) - mask.sum(axis=0)
+            self.total += np.where(mask, 0.0, values).sum(axis=0)
+            if imputation == 'median':
+                if hashes is None:
+                    hashes = np.zeros(len(values), dtype=np.uint64)
+                self.sample = np.concatenate([self.sample, values])
+                self.sample_hashes = np.concatenate([self.sample_hashes, hashes])
+                if self.sample_size is not None and len(self.sample) > self.sample_size:
+                    keep = np.argpartition(self.sample_hashes, self.sample_size)[:self.sample_size]
+                    self.sample, self.sample_hashes = self.sample[keep], self.sample_hashes[keep]
+            for c in self.categorical:
+                self.categories[c].update(X[c].dropna().astype(str).unique())
+        
+        def spec(self):
+            fill = np.zeros(len(self.numeric))
+            has_values = self.observed > 0
+            if imputation == 'median' and len(self.sample):
+                observed_sample = ~np.isnan(self.sample).all(axis=0)
+                fill[observed_sample] = np.nanmedian(self.sample[:, observed_sample], axis=0)
+            elif imputation == 'mean':
+                fill[has_values] = self.total[has_values] / self.observed[has_values]
+            indicators = []
+            if missing_indicators and imputation != 'drop':
+                indicators = [c for c, n in zip(self.numeric, self.missing) if n > 0]
+            categories = {c: sorted(self.categories[c]) for c in self.categorical}
+            feature_names = list(self.numeric)
+            for c in self.categorical:
+                if categorical_encoding == 'onehot':
+                    feature_names += [f'{c}={value}' for value in categories[c]]
+                else:
+                    feature_names.append(c)
+            feature_names += [f'{c}_missing' for c in indicators]
+            return {
+                'imputation': imputation,
+                'input_features': self.input_features,
+                'numeric_features': self.numeric,
+                'fill_values': fill.tolist(),
+                'missing_counts': self.missing.tolist(),
+                'indicator_features': indicators,
+                'categorical_features': self.categorical,
+                'categorical_encoding': categorical_encoding,
+                'categories': categories,
+                'feature_names': feature_names
+            }
+    
+    def apply_transform(X, spec):
+        # Impute, encode and append missing indicators into one float32 matrix
+        values = X[spec['numeric_features']].to_numpy(dtype=np.float32)
+        mask = np.isnan(values)
+        out = np.empty((len(X), len(spec['feature_names'])), dtype=np.float32)
+        n_numeric = values.shape[1]
+        np.copyto(out[:, :n_numeric], np.where(mask, np.asarray(spec['fill_values'], dtype=np.float32), values))
+        column = n_numeric
+        for c in spec['categorical_features']:
+            categories = spec['categories'][c]
+            # Missing and unseen values get code -1 (all zeros when one-hot encoded)
+            codes = X[c].astype(str).map({value: i for i, value in enumerate(categories)})
+            codes = np.where(X[c].isna().to_numpy(), -1, codes.fillna(-1).to_numpy(dtype=np.int64))
+            if spec['categorical_encoding'] == 'onehot':
+                out[:, column:column + len(categories)] = codes[:, None] == np.arange(len(categories))
+                column += len(categories)
+            else:
+                out[:, column] = codes
+                column += 1
+        indicator_index = [spec['numeric_features'].index(c) for c in spec['indicator_features']]
+        out[:, column:] = mask[:, indicator_index]
+        return out
+    
+    def label_dtype(dtype, low, high):
+        # Smallest integer dtype holding every label; other label types are kept
+        if not np.issubdtype(dtype, np.integer):
+            return dtype
+        return np.result_type(np.min_scalar_type(low), np.min_scalar_type(high))
+    
+    # A shard manifest (from gcs_transfer.upload_dataset, or the manifest.json of a
+    # data_generator shard directory) lists the files that make up the dataset
+    manifest_path = input_data.path
+    if os.path.isdir(input_data.path):
+        manifest_path = os.path.join(input_data.path, 'manifest.json')
+    input_files = [input_data.path]
+    with open(manifest_path, 'rb') as f:
+        if f.read(1) == b'{':
+            f.seek(0)
+            input_files = [
+                shard['file'] if shard['file'].startswith('gs://')
+                else os.path.normpath(os.path.join(os.path.dirname(manifest_path), shard['file']))
+                for shard in json.load(f)['shards']
+            ]
+    
+    # Uploaded manifests name their shards by gs:// URI; fetch them concurrently
+    remote_shards = [path for path in input_files if path.startswith('gs://')]
+    if remote_shards:
+        perf.start('fetch_shards')
+        shard_dir = tempfile.mkdtemp()
+        downloads = {}
+        for uri in remote_shards:
+            shard_bucket, _, blob_name = uri[len('gs://'):].partition('/')
+            downloads.setdefault(shard_bucket, {})[blob_name] = os.path.join(shard_dir, shard_bucket, blob_name)
+        for shard_bucket, files in downloads.items():
+            download_files(shard_bucket, files)
+        input_files = [
+            os.path.join(shard_dir, *path[len('gs://'):].split('/')) if path.startswith('gs://') else path
+            for path in input_files
+        ]
+    
+    # Detect Parquet, Feather/Arrow and NPY inputs by their magic bytes
+    def file_magic(path):
+        with open(path, 'rb') as f:
+            return f.read(6)
+    
+    os.makedirs(processed_data.path, exist_ok=True)
+    
+    def array_path(name):
+        return os.path.join(processed_data.path, f'{name}.npy')
+    
+    if not streaming:
+        # Load data
+        perf.start('load')
+        
+        def read_file(path):
+            magic = file_magic(path)
+            if magic.startswith(b'PAR1'):
+                return pd.read_parquet(path)
+            elif magic.startswith(b'ARROW1'):
+                return pd.read_feather(path)
+            elif magic.startswith(b'\x93NUMPY'):
+                return pd.DataFrame(np.load(path))
+            return pd.read_csv(path)
+        
+        if len(input_files) == 1:
+            df = read_file(input_files[0])
+        else:
+            df = pd.concat([read_file(path) for path in input_files], ignore_index=True)
+        
+        # Basic preprocessing
+        perf.start('preprocess')
+        if imputation == 'drop':
+            df = df.dropna()
+        
+        # Prepare features and target
+        X = df.drop('target', axis=1)
+        y = df['target'].to_numpy()
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, random_state=42
+        )
+        
+        # Fit the transform on the training rows and apply it to both splits
+        fitter = TransformFitter()
+        fitter.update(X_train)
+        transform = fitter.spec()
+        X_train_scaled = apply_transform(X_train, transform)
+        X_test_scaled = apply_transform(X_test, transform)
+        feature_names = transform['feature_names']
+        
+        # Scale features in place
+        scaler = StandardScaler(copy=False)
+        X_train_scaled = scaler.fit(X_train_scaled).transform(X_train_scaled)
+        X_test_scaled = scaler.transform(X_test_scaled)
+        
+        # Save processed data as memory-mappable .npy arrays
+        perf.start('write')
+        y_dtype = y.dtype
+        if len(y) and np.issubdtype(y_dtype, np.integer):
+            y_dtype = label_dtype(y_dtype, y.min(), y.max())
+        arrays = {
+            'X_train': X_train_scaled,
+            'X_test': X_test_scaled,
+            'y_train': y_train.astype(y_dtype),
+            'y_test': y_test.astype(y_dtype)
+        }
+        for name, array in arrays.items():
+            np.save(array_path(name), np.ascontiguousarray(array))
+        
+        samples = len(df)
+    else:
+        # Out-of-core mode: memory use is bounded by chunk_size, not the input size
+        def iter_chunks():
+            for path in input_files:
+                magic = file_magic(path)
+                if magic.startswith(b'PAR1'):
+                    import pyarrow.parquet as pq
+                    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+                        yield batch.to_pandas()
+                elif magic.startswith(b'ARROW1'):
+                    import pyarrow as pa
+                    reader = pa.ipc.open_file(path)
+                    for i in range(reader.num_record_batches):
+                        batch = reader.get_batch(i)
+                        for offset in range(0, batch.num_rows, chunk_size):
+                            yield batch.slice(offset, chunk_size).to_pandas()
+                elif magic.startswith(b'\x93NUMPY'):
+                    records = np.load(path, mmap_mode='r')
+                    for offset in range(0, len(records), chunk_size):
+                        yield pd.DataFrame(np.asarray(records[offset:offset + chunk_size]))
+                else:
+                    yield from pd.read_csv(path, chunksize=chunk_size)
+        
+        def split_chunk(chunk):
+            # Hash each row's contents so its train/test assignment is deterministic
+            # and independent of chunking and row order
+            if imputation == 'drop':
+                chunk = chunk.dropna()
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            is_test = (hashes >> np.uint64(11)) / float(2 ** 53) < test_size
+            return chunk.drop('target', axis=1), chunk['target'], is_test, hashes
+        
+        # First pass: fit the transform on training rows and count the split sizes;
+        # medians come from a 200k-row sample chosen by content hash
+        perf.start('fit_transform')
+        fitter = TransformFitter(sample_size=200000)
+        n_train = n_test = 0
+        y_dtype = None
+        y_low = y_high = 0
+        for chunk in iter_chunks():
+            X_chunk, y_chunk, is_test, hashes = split_chunk(chunk)
+            if y_dtype is None:
+                y_dtype = y_chunk.dtype
+            if (~is_test).any():
+                fitter.update(X_chunk[~is_test], hashes[~is_test])
+            if len(y_chunk) and np.issubdtype(y_dtype, np.integer):
+                y_low, y_high = min(y_low, y_chunk.min()), max(y_high, y_chunk.max())
+            n_train += int((~is_test).sum())
+            n_test += int(is_test.sum())
+        if not n_train:
+            raise ValueError(f"The hash split put all {n_test} rows in the test set, leaving no "
+                             f"training rows to fit the transform; lower test_size or add rows")
+        transform = fitter.spec()
+        feature_names = transform['feature_names']
+        y_dtype = label_dtype(y_dtype, y_low, y_high)
+        
+        # Second pass: transform each chunk straight into the output arrays while
+        # fitting the scaler on the training rows
+        perf.start('transform_write')
+        n_features = len(feature_names)
+        arrays = {
+            'X_train': np.lib.format.open_memmap(array_path('X_train'), mode='w+', dtype=np.float32, shape=(n_train, n_features)),
+            'X_test': np.lib.format.open_memmap(array_path('X_test'), mode='w+', dtype=np.float32, shape=(n_test, n_features)),
+            'y_train': np.lib.format.open_memmap(array_path('y_train'), mode='w+', dtype=y_dtype, shape=(n_train,)),
+            'y_test': np.lib.format.open_memmap(array_path('y_test'), mode='w+', dtype=y_dtype, shape=(n_test,))
+        }
+        scaler = StandardScaler()
+        train_offset = test_offset = 0
+        for chunk in iter_chunks():
+            X_chunk, y_chunk, is_test, _ = split_chunk(chunk)
+            X_transformed = apply_transform(X_chunk, transform)
+            if (~is_test).any():
+                scaler.partial_fit(X_transformed[~is_test])
+            n_chunk_train = int((~is_test).sum())
+            n_chunk_test = int(is_test.sum())
+            arrays['X_train'][train_offset:train_offset + n_chunk_train] = X_transformed[~is_test]
+            arrays['y_train'][train_offset:train_offset + n_chunk_train] = y_chunk.to_numpy()[~is_test]
+            arrays['X_test'][test_offset:test_offset + n_chunk_test] = X_transformed[is_test]
+            arrays['y_test'][test_offset:test_offset + n_chunk_test] = y_chunk.to_numpy()[is_test]
+            train_offset += n_chunk_train
+            test_offset += n_chunk_test
+        
+        # Scale the written arrays in place, chunk_size rows at a time
+        perf.start('scale')
+        for name in ['X_train', 'X_test']:
+            for offset in range(0, len(arrays[name]), chunk_size):
+                block = arrays[name][offset:offset + chunk_size]
+                block[...] = scaler.transform(block)
+        for array in arrays.values():
+            array.flush()
+        
+        samples = n_train + n_test
+    
+    # Save a small JSON sidecar holding the scaler parameters and feature names
+    metadata = {
+        'feature_names': feature_names,
+        'transform': {name: value for name, value in transform.items() if name != 'feature_names'},
+        'scaler': {
+            'mean': scaler.mean_.tolist(),
+            'scale': scaler.scale_.tolist(),
+            'var': scaler.var_.tolist(),
+            'n_samples_seen': int(scaler.n_samples_seen_)
+        },
+        'arrays': {
+            name: {'shape': list(array.shape), 'dtype': str(array.dtype)}
+            for name, array in arrays.items()
+        }
+    }
+    with open(os.path.join(processed_data.path, 'preprocessing.json'), 'w') as f:
+        json.dump(metadata, f)
+    
+    # Upload to GCS for persistence
+    perf.start('upload')
+    upload_files(bucket_name, {
+        os.path.join(processed_data.path, file_name):
+            f'processed_data/{os.path.basename(processed_data.path)}/{file_name}'
+        for file_name in sorted(os.listdir(processed_data.path))
+    })
+    
+    if cache_uri:
+        perf.start('cache_store')
+        cache.save({'processed_data': processed_data.path}, {'samples': samples, 'features': len(feature_names)})
+    
+    perf.write(performance)
+    return PreprocessOutput(samples, len(feature_names))
+
+# Component for model training
+@component(
+    base_image="python:3.9",
+    target_image=COMPONENT_IMAGE,
+    packages_to_install=[
+        "scikit-learn==1.3.2",
+        "pandas==2.1.3",
+        "numpy==1.25.2",
+        "joblib==1.3.2",
+        "google-cloud-storage==2.14.0"
+    ]
+)
+def train_model(
+    processed_data: Input[Dataset],
+    model: Output[Model],
+    metrics: Output[Metrics],
+    performance: Output[Metrics],
+    bucket_name: str,
+    algorithm: str = "random_forest",
+    batch_size: int = 100000,
+    epochs: int = 5,
+    cache_uri: str = "",
+    hyperparameters: str = "",
+    checkpoint_uri: str = "",
+    checkpoint_interval: float = 60.0,
+    pipeline_run_id: str = ""
+) -> NamedTuple('TrainOutput', [('accuracy', float), ('f1_score', float)]):
+    """
+    Train a machine learning model
+    
+    The ``sgd`` algorithm trains incrementally with ``partial_fit``, feeding
+    ``batch_size`` rows at a time from the memory-mapped arrays for ``epochs``
+    passes, so the training set never has to fit in memory.
+    
+    ``hyperparameters`` is an optional JSON object of estimator parameters
+    (e.g. the ``best_params`` of sweep_hyperparameters) overriding the defaults.
+    
+    If ``cache_uri`` is set, a previous run's model and metrics for identical
+    processed data and parameters are restored instead of retraining.
+    
+    If ``checkpoint_uri`` (a gs:// prefix or local directory) is set, the
+    partial fit is checkpointed at most every ``checkpoint_interval`` seconds:
+    the ``random_forest`` is grown a few trees at a time with ``warm_start``
+    and ``sgd`` saves its position within the ``partial_fit`` epochs. A
+    restarted run, e.g. after its preemptible node was reclaimed, resumes from
+    the last checkpoint, so at most one interval of fitting is lost.
+    ``logistic_regression`` is fitted in one call and not checkpointed.
+    Checkpoints are keyed by the training parameters, ``pipeline_run_id`` (the
+    pipeline passes its run ID, which retries of the step keep) and the input:
+    the step cache key when ``cache_uri`` is set, otherwise the
+    ``processed_data`` URI. Concurrent runs on the same data therefore never
+    share a checkpoint. The checkpoint is deleted when the step succeeds; a
+    preemption after the last checkpoint of a fit repeats at most one
+    interval.
+    
+    In ``performance`` the ``fit`` phase includes the time spent writing
+    checkpoints, and ``checkpoint_restore`` the time spent loading one.
+    """
+    
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.metrics import accuracy_score, f1_score, classification_report
+    from collections import namedtuple
+    import joblib
+    import json
+    import os
+    import tempfile
+    import time
+    from instrumentation import PhaseRecorder
+    from step_cache import StepCache, content_digest
+    from gcs_transfer import get_client, upload_files
+    
+    TrainOutput = namedtuple('TrainOutput', ['accuracy', 'f1_score'])
+    
+    perf = PhaseRecorder('train_model')
+    
+    if cache_uri:
+        perf.start('cache_lookup')
+        cache = StepCache(
+            cache_uri, 'train_model',
+            {'algorithm': algorithm, 'batch_size': batch_size, 'epochs': epochs,
+             'hyperparameters': hyperparameters, 'cache_version': 1},
+            [processed_data.path]
+        )
+        cached = cache.load({'model': model.path, 'metrics': metrics.path})
+        if cached is not None:
+            print(f"Cache hit for train_model ({cache.key}), reusing previous outputs")
+            perf.write(performance)
+            return TrainOutput(cached['accuracy'], cached['f1_score'])
+    
+    # A partial fit is stored as one object under the given key, in a gs://
+    # prefix or local directory
+    class CheckpointStore:
+        def __init__(self, checkpoint_uri, key):
+            self.key = key
+            self.blob = None
+            if checkpoint_uri.startswith('gs://'):
+                checkpoint_bucket, _, prefix = checkpoint_uri[len('gs://'):].partition('/')
+                name = '/'.join(part for part in [prefix.strip('/'), 'train_model', f'{key}.joblib'] if part)
+                self.blob = get_client().bucket(checkpoint_bucket).blob(name)
+            else:
+                self.path = os.path.join(checkpoint_uri, 'train_model', f'{key}.joblib')
+        
+        def load(self):
+            if self.blob is None:
+                return joblib.load(self.path) if os.path.exists(self.path) else None
+            if not self.blob.exists():
+                return None
+            with tempfile.TemporaryDirectory() as tmp:
+                self.blob.download_to_filename(os.path.join(tmp, 'checkpoint.joblib'))
+                return joblib.load(os.path.join(tmp, 'checkpoint.joblib'))
+        
+        def save(self, checkpoint):
+            # Write to a temporary file first, so a kill mid-write leaves the previous checkpoint
+            if self.blob is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                partial_file = f'{self.path}.{os.getpid()}.partial'
+                joblib.dump(checkpoint, partial_file)
+                os.replace(partial_file, self.path)
+                return
+            with tempfile.TemporaryDirectory() as tmp:
+                joblib.dump(checkpoint, os.path.join(tmp, 'checkpoint.joblib'))
+                self.blob.upload_from_filename(os.path.join(tmp, 'checkpoint.joblib'))
+        
+        def clear(self):
+            if self.blob is None:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+            elif self.blob.exists():
+                self.blob.delete()
+    
+    # Memory-map the processed arrays instead of deserializing a full copy
+    perf.start('load')
+    def load_array(name):
+        return np.load(os.path.join(processed_data.path, f'{name}.npy'), mmap_mode='r')
+    
+    X_train = load_array('X_train')
+    X_test = load_array('X_test')
+    y_train = load_array('y_train')
+    y_test = load_array('y_test')
+    
+    batch_starts = range(0, len(X_train), batch_size)
+    
+    # Select algorithm
+    if algorithm == "random_forest":
+        model_obj = RandomForestClassifier(
+            n_estimators=100,
+            random_state=42,
+            n_jobs=-1  # Use all available CPUs
+        )
+    elif algorithm == "sgd":
+        model_obj = SGDClassifier(
+            loss="log_loss",
+            random_state=42
+        )
+    else:
+        model_obj = LogisticRegression(
+            random_state=42,
+            max_iter=1000,
+            n_jobs=-1
+        )
+    
+    if hyperparameters:
+        model_obj.set_params(**json.loads(hyperparameters))
+        print(f"Using hyperparameters: {hyperparameters}")
+    
+    # Resume from the last checkpoint of an interrupted run
+    progress = {}
+    fit_seconds_restored = 0.0
+    if checkpoint_uri:
+        perf.start('checkpoint_restore')
+        # The step cache already digested the processed data; otherwise key on
+        # the upstream artifact URI. Both stay the same across retries of a run,
+        # and the run ID keeps concurrent runs on the same data apart
+        checkpoint_key = content_digest(
+            {'algorithm': algorithm, 'batch_size': batch_size, 'epochs': epochs,
+             'hyperparameters': hyperparameters, 'pipeline_run_id': pipeline_run_id,
+             'input': cache.key if cache_uri else processed_data.uri,
+             'checkpoint_version': 3},
+            []
+        )
+        checkpoint_store = CheckpointStore(checkpoint_uri, checkpoint_key)
+        checkpoint = checkpoint_store.load()
+        if checkpoint is not None:
+            model_obj = checkpoint['model']
+            progress = checkpoint['progress']
+            fit_seconds_restored = checkpoint['fit_seconds']
+            print(f"Resuming from checkpoint {checkpoint_store.key[:12]} at {progress} "
+                  f"({fit_seconds_restored:.1f}s of fitting restored)")
+    
+    # Train model
+    perf.start('fit')
+    fit_start = time.perf_counter()
+    last_checkpoint = fit_start
+    checkpoints_written = 0
+    checkpoint_seconds = 0.0
+    
+    def save_checkpoint(progress):
+        nonlocal last_checkpoint, checkpoints_written, checkpoint_seconds
+        now = time.perf_counter()
+        if not checkpoint_uri or now - last_checkpoint < checkpoint_interval:
+            return
+        checkpoint_store.save({
+            'model': model_obj,
+            'progress': progress,
+            'fit_seconds': fit_seconds_restored + now - fit_start
+        })
+        last_checkpoint = time.perf_counter()
+        checkpoints_written += 1
+        checkpoint_seconds += last_checkpoint - now
+        print(f"Checkpointed {progress}")
+    
+    if algorithm == "sgd":
+        classes = np.unique(y_train)
+        rng = np.random.default_rng(42)
+        batches_done = 0
+        for epoch in range(epochs):
+            # Visit the batches in a different order each epoch
+            for start in rng.permutation(batch_starts):
+                batches_done += 1
+                if batches_done <= progress.get('batches', 0):
+                    continue
+                model_obj.partial_fit(
+                    X_train[start:start + batch_size],
+                    y_train[start:start + batch_size],
+                    classes=classes
+                )
+                if batches_done < epochs * len(batch_starts):
+                    save_checkpoint({'epoch': epoch, 'batches': batches_done})
+    elif algorithm == "random_forest" and checkpoint_uri:
+        # Grow the forest with warm_start; the trees match a single fit, as
+        # each tree's seed is drawn from random_state in order
+        n_estimators = model_obj.n_estimators if not progress else progress['n_estimators']
+        trees_per_step = max(10, os.cpu_count() or 1)
+        model_obj.set_params(warm_start=True)
+        trees = len(getattr(model_obj, 'estimators_', []))
+        while trees < n_estimators:
+            trees = min(trees + trees_per_step, n_estimators)
+            model_obj.set_params(n_estimators=trees)
+            model_obj.fit(X_train, y_train)
+            if trees < n_estimators:
+                save_checkpoint({'trees': trees, 'n_estimators': n_estimators})
+        model_obj.set_params(warm_start=False)
+    else:
+        model_obj.fit(X_train, y_train)
+    fit_seconds = fit_seconds_restored + time.perf_counter() - fit_start
+    rows_trained = len(X_train) * epochs if algorithm == "sgd" else len(X_train)
+    
+    # Evaluate model in batches to keep memory bounded
+    perf.start('predict')
+    predict_start = time.perf_counter()
+    y_pred = np.concatenate([
+        model_obj.predict(X_test[start:start + batch_size])
+        for start in range(0, len(X_test), batch_size)
+    ])
+    predict_seconds = time.perf_counter() - predict_start
+    accuracy = accuracy_score(y_test, y_pred)
+    f1 = f1_score(y_test, y_pred, average='weighted')
+    
+    # Save model
+    perf.start('save')
+    joblib.dump(model_obj, model.path)
+    
+    # Save metrics
+    metrics_dict = {
+        'accuracy': accuracy,
+        'f1_score': f1,
+        'algorithm': algorithm,
+        'train_rows': len(X_train),
+        'fit_seconds': fit_seconds,
+        'train_rows_per_sec': rows_trained / fit_seconds if fit_seconds > 0 else None,
+        'predict_rows_per_sec': len(X_test) / predict_seconds if predict_seconds > 0 else None,
+        'hyperparameters': json.loads(hyperparameters) if hyperparameters else {},
+        'classification_report': classification_report(y_test, y_pred, output_dict=True)
+    }
+    if checkpoint_uri:
+        metrics_dict['checkpoint'] = {
+            'resumed_from': progress or None,
+            'fit_seconds_restored': fit_seconds_restored,
+            'checkpoints_written': checkpoints_written,
+            'checkpoint_seconds': checkpoint_seconds
+        }
+    
+    with open(metrics.path, 'w') as f:
+        json.dump(metrics_dict, f)
+    
+    # Upload model and metrics to GCS concurrently
+    perf.start('upload')
+    upload_files(bucket_name, {
+        model.path: f'models/{os.path.basename(model.path)}',
+        metrics.path: f'metrics/{os.path.basename(metrics.path)}'
+    })
+    
+    if cache_uri:
+        perf.start('cache_store')
+        cache.save({'model': model.path, 'metrics': metrics.path}, {'accuracy': accuracy, 'f1_score': f1})
+    
+    if checkpoint_uri:
+        checkpoint_store.clear()
+    
+    perf.write(performance)
+    return TrainOutput(accuracy, f1)
+
+# Component for training several algorithms in one step
+@component(
+    base_image="python:3.9",
+    target_image=COMPONENT_IMAGE,
+    packages_to_install=[
+        "scikit-learn==1.3.2",
+        "numpy==1.25.2",
+        "joblib==1.3.2",
+        "google-cloud-storage==2.14.0"
+    ]
+)
+def train_models(
+    processed_data: Input[Dataset],
+    model: Output[Model],
+    metrics: Output[Metrics],
+    leaderboard: Output[Metrics],
+    performance: Output[Metrics],
+    bucket_name: str,
+    algorithms: list = ["random_forest", "logistic_regression", "sgd"],
+    selection_metric: str = "f1_score",
+    validation_fraction: float = 0.2,
+    refit: bool = True,
+    batch_size: int = 100000,
+    epochs: int = 5,
+    n_workers: int = -1,
+    hyperparameters: str = ""
+) -> NamedTuple('TrainModelsOutput', [('accuracy', float), ('f1_score', float), ('algorithm', str)]):
+    """
+    Train several algorithms on the same processed data and keep the best
+    
+    The algorithms are trained concurrently in ``n_workers`` processes (-1: one
+    per algorithm, capped at the CPU count), and the CPUs are divided between
+    them. Every worker memory-maps the processed arrays and trains on a
+    contiguous slice of them, so the data is read once into the page cache and
+    shared rather than copied per model.
+    
+    Candidates are trained on the training set minus its last
+    ``validation_fraction`` of rows (at least one; the fraction must be between
+    0 and 1) and ranked by ``selection_metric`` (``accuracy`` or ``f1_score``)
+    on those held-out rows, so the test set used by validate_model plays no
+    part in the choice. preprocess_data shuffles the
+    training rows, so the tail is a random sample; with streaming preprocessing
+    the rows keep the input's order, which should then not be sorted. With
+    ``refit`` the winner is then retrained on the full training set. ``model``
+    and ``metrics`` hold the winner in the same format as train_model, so
+    validate_model and prepare_deployment work unchanged; ``leaderboard`` lists
+    every algorithm.
+    
+    ``hyperparameters`` is an optional JSON object mapping an algorithm to
+    estimator parameters overriding its defaults.
+    
+    The ``fit`` phase in ``performance`` is the wall time to train every
+    algorithm; its CPU time and peak RSS cover only this process, not the
+    workers. The winner's retraining runs here and is reported as ``refit``.
+    """
+    
+    import numpy as np
+    from joblib import Parallel, delayed
+    from sklearn.metrics import accuracy_score, f1_score, classification_report
+    from collections import namedtuple
+    import joblib
+    import json
+    import os
+    import time
+    from instrumentation import PhaseRecorder
+    from gcs_transfer import upload_files
+    
+    TrainModelsOutput = namedtuple('TrainModelsOutput', ['accuracy', 'f1_score', 'algorithm'])
+    
+    perf = PhaseRecorder('train_models')
+    
+    if selection_metric not in ('accuracy', 'f1_score'):
+        raise ValueError(f"Unknown selection_metric {selection_metric!r}; use 'accuracy' or 'f1_score'")
+    if not 0 < validation_fraction < 1:
+        raise ValueError(f"validation_fraction must be between 0 and 1, got {validation_fraction}; "
+                         f"the algorithms are never ranked on the test set")
+    overrides = json.loads(hyperparameters) if hyperparameters else {}
+    
+    # Hold out part of the training set for choosing between the algorithms
+    perf.start('load')
+    def load_array(name):
+        return np.load(os.path.join(processed_data.path, f'{name}.npy'), mmap_mode='r')
+    
+    y_train = load_array('y_train')
+    n_validation = max(1, int(len(y_train) * validation_fraction))
+    n_fit = len(y_train) - n_validation
+    if n_fit < 1:
+        raise ValueError(f"{len(y_train)} training rows are too few to hold out a validation split")
+    classes = np.unique(y_train)
+    
+    n_cpus = os.cpu_count() or 1
+    n_parallel = min(len(algorithms), n_cpus) if n_workers < 0 else max(1, min(n_workers, len(algorithms)))
+    threads_per_model = max(1, n_cpus // n_parallel)
+    
+    def fit(algorithm, n_rows, n_jobs):
+        # Trains on the first n_rows training rows; slicing the memory map gives a
+        # view of the page cache, where indexing with a row list would copy it
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        
+        X = load_array('X_train')[:n_rows]
+        y = load_array('y_train')[:n_rows]
+        if algorithm == "random_forest":
+            estimator = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+        elif algorithm == "sgd":
+            estimator = SGDClassifier(loss="log_loss", random_state=42)
+        else:
+            estimator = LogisticRegression(random_state=42, max_iter=1000, n_jobs=n_jobs)
+        estimator.set_params(**overrides.get(algorithm, {}))
+        
+        start = time.perf_counter()
+        if algorithm == "sgd":
+            rng = np.random.default_rng(42)
+            batch_starts = range(0, n_rows, batch_size)
+            for epoch in range(epochs):
+                for batch_start in rng.permutation(batch_starts):
+                    estimator.partial_fit(X[batch_start:batch_start + batch_size],
+                                          y[batch_start:batch_start + batch_size], classes=classes)
+        else:
+            estimator.fit(X, y)
+        return estimator, time.perf_counter() - start
+    
+    def fit_and_score(algorithm):
+        estimator, fit_seconds = fit(algorithm, n_fit, threads_per_model)
+        y_validation = load_array('y_train')[n_fit:]
+        y_pred = estimator.predict(load_array('X_train')[n_fit:])
+        scores = {
+            'accuracy': float(accuracy_score(y_validation, y_pred)),
+            'f1_score': float(f1_score(y_validation, y_pred, average='weighted'))
+        }
+        return estimator, {'algorithm': algorithm, 'fit_seconds': fit_seconds, 'train_rows': n_fit, **scores}
+    
+    # Train every algorithm concurrently
+    perf.start('fit')
+    print(f"Training {', '.join(algorithms)} on {n_parallel} workers with {threads_per_model} threads each")
+    results = Parallel(n_jobs=n_parallel)(delayed(fit_and_score)(algorithm) for algorithm in algorithms)
+    
+    X_test = load_array('X_test')
+    y_test = load_array('y_test')
+    
+    def predict(estimator, X):
+        return np.concatenate([
+            estimator.predict(X[start:start + batch_size]) for start in range(0, len(X), batch_size)
+        ])
+    
+    ranking = sorted(results, key=lambda result: result[1][selection_metric], reverse=True)
+    
+    model_obj, best = ranking[0]
+    algorithm = best['algorithm']
+    print(f"Selected {algorithm} ({selection_metric} {best[selection_metric]:.4f} on the validation split)")
+    
+    fit_seconds = best['fit_seconds']
+    rows_trained = n_fit
+    if refit:
+        perf.start('refit')
+        model_obj, fit_seconds = fit(algorithm, len(y_train), -1)
+        rows_trained = len(y_train)
+    if algorithm == "sgd":
+        rows_trained *= epochs
+    
+    # Evaluate the selected model on the test set
+    perf.start('predict')
+    predict_start = time.perf_counter()
+    y_pred = predict(model_obj, X_test)
+    predict_seconds = time.perf_counter() - predict_start
+    accuracy = accuracy_score(y_test, y_pred)
+    f1 = f1_score(y_test, y_pred, average='weighted')
+    
+    # Save model
+    perf.start('save')
+    joblib.dump(model_obj, model.path)
+    
+    # Save metrics in train_model's format
+    metrics_dict = {
+        'accuracy': accuracy,
+        'f1_score': f1,
+        'algorithm': algorithm,
+        'train_rows': len(y_train) if refit else n_fit,
+        'fit_seconds': fit_seconds,
+        'train_rows_per_sec': rows_trained / fit_seconds if fit_seconds > 0 else None,
+        'predict_rows_per_sec': len(X_test) / predict_seconds if predict_seconds > 0 else None,
+        'hyperparameters': overrides.get(algorithm, {}),
+        'selected_from': [entry['algorithm'] for _, entry in ranking],
+        'classification_report': classification_report(y_test, y_pred, output_dict=True)
+    }
+    
+    with open(metrics.path, 'w') as f:
+        json.dump(metrics_dict, f)
+    
+    for _, entry in ranking:
+        leaderboard.log_metric(f"{entry['algorithm']}_{selection_metric}", entry[selection_metric])
+        leaderboard.log_metric(f"{entry['algorithm']}_fit_seconds", entry['fit_seconds'])
+    with open(leaderboard.path, 'w') as f:
+        json.dump({
+            'selection_metric': selection_metric,
+            'validation_rows': n_validation,
+            'selected': algorithm,
+            'leaderboard': [{'rank': rank, **entry} for rank, (_, entry) in enumerate(ranking, 1)]
+        }, f, indent=2)
+    
+    # Upload model, metrics and leaderboard to GCS concurrently
+    perf.start('upload')
+    upload_files(bucket_name, {
+        model.path: f'models/{os.path.basename(model.path)}',
+        metrics.path: f'metrics/{os.path.basename(metrics.path)}',
+        leaderboard.path: f'metrics/{os.path.basename(leaderboard.path)}_leaderboard'
+    })
+    
+    perf.write(performance)
+    return TrainModelsOutput(accuracy, f1, algorithm)
+
+# Component for hyperparameter search
+@component(
+    base_image="python:3.9",
+    target_image=COMPONENT_IMAGE,
+    packages_to_install=[
+        "scikit-learn==1.3.2",
+        "numpy==1.25.2",
+        "joblib==1.3.2"
+    ]
+)
+def sweep_hyperparameters(
+    processed_data: Input[Dataset],
+    leaderboard: Output[Metrics],
+    performance: Output[Metrics],
+    algorithm: str = "random_forest",
+    search_space: str = "",
+    n_candidates: int = 16,
+    eta: int = 3,
+    min_rows: int = 1000,
+    validation_fraction: float = 0.2,
+    n_workers: int = -1,
+    random_state: int = 42
+) -> NamedTuple('SweepOutput', [('best_params', str), ('best_score', float)]):
+    """
+    Search hyperparameters with successive halving
+    
+    ``search_space`` is a JSON object mapping parameter names to lists of values,
+    or a Katib-style ``{"parameters": [{"name", "parameterType", "feasibleSpace"}]}``
+    spec (int/double ranges with min/max/step, categorical/discrete lists). The
+    full grid is used if it has at most ``n_candidates`` points, otherwise
+    ``n_candidates`` points are sampled (doubles spanning two or more decades
+    log-uniformly). An empty space uses a default per algorithm.
+    
+    Candidates are first trained on ``min_rows`` rows of the training set and
+    scored on a held-out ``validation_fraction`` of it (the test set is left
+    untouched); each rung keeps the best 1/``eta`` and multiplies the rows by
+    ``eta`` until the full training set is used. Candidates of a rung are fitted
+    in parallel on ``n_workers`` processes (-1: all CPUs), which memory-map the
+    processed arrays rather than receiving copies.
+    
+    ``leaderboard`` lists every candidate with its score at each rung it reached.
+    """
+    
+    import numpy as np
+    from joblib import Parallel, delayed
+    from collections import namedtuple
+    import itertools
+    import json
+    import math
+    import os
+    import time
+    from instrumentation import PhaseRecorder
+    
+    SweepOutput = namedtuple('SweepOutput', ['best_params', 'best_score'])
+    
+    perf = PhaseRecorder('sweep_hyperparameters')
+    
+    default_spaces = {
+        'random_forest': {'n_estimators': [50, 100, 200], 'max_depth': [None, 10, 20], 'min_samples_leaf': [1, 5]},
+        'logistic_regression': {'C': [0.01, 0.1, 1.0, 10.0, 100.0]},
+        'sgd': {'alpha': [1e-5, 1e-4, 1e-3, 1e-2], 'penalty': ['l2', 'l1', 'elasticnet']}
+    }
+    
+    # Expand the search space into candidate parameter sets
+    perf.start('candidates')
+    space = json.loads(search_space) if search_space else default_spaces[algorithm]
+    rng = np.random.default_rng(random_state)
+    
+    if 'parameters' in space:
+        dimensions = {}
+        for parameter in space['parameters']:
+            feasible = parameter['feasibleSpace']
+            kind = parameter['parameterType']
+            if kind in ('categorical', 'discrete'):
+                values = [json.loads(v) if kind == 'discrete' else v for v in feasible['list']]
+            elif kind == 'int':
+                values = list(range(int(feasible['min']), int(feasible['max']) + 1, int(feasible.get('step', 1))))
+            elif 'step' in feasible:
+                values = np.arange(float(feasible['min']), float(feasible['max']) + 1e-12,
+                                   float(feasible['step'])).tolist()
+            else:
+                low, high = float(feasible['min']), float(feasible['max'])
+                values = ('log' if low > 0 and high / low >= 100 else 'uniform', low, high)
+            dimensions[parameter['name']] = values
+    else:
+        dimensions = space
+    
+    names = list(dimensions)
+    if all(isinstance(values, list) for values in dimensions.values()) and \
+            math.prod(len(values) for values in dimensions.values()) <= n_candidates:
+        candidates = [dict(zip(names, combo)) for combo in itertools.product(*dimensions.values())]
+    else:
+        candidates = []
+        for _ in range(n_candidates):
+            candidate = {}
+            for name, values in dimensions.items():
+                if isinstance(values, list):
+                    candidate[name] = values[rng.integers(len(values))]
+                elif values[0] == 'log':
+                    candidate[name] = float(np.exp(rng.uniform(np.log(values[1]), np.log(values[2]))))
+                else:
+                    candidate[name] = float(rng.uniform(values[1], values[2]))
+            candidates.append(candidate)
+        # Drop duplicate samples from small discrete spaces
+        candidates = list({json.dumps(c, sort_keys=True): c for c in candidates}.values())
+    
+    # Hold out part of the training set for scoring; the test set stays unseen
+    y_train = np.load(os.path.join(processed_data.path, 'y_train.npy'), mmap_mode='r')
+    order = rng.permutation(len(y_train))
+    n_validation = max(1, int(len(order) * validation_fraction))
+    validation_rows = np.sort(order[:n_validation])
+    fit_order = order[n_validation:]
+    
+    def evaluate(candidate, n_rows):
+        # Workers open the arrays by path, so only the candidate is sent to them;
+        # the rung's sampled rows are gathered into one array per fit
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        
+        X = np.load(os.path.join(processed_data.path, 'X_train.npy'), mmap_mode='r')
+        y = np.load(os.path.join(processed_data.path, 'y_train.npy'), mmap_mode='r')
+        rows = np.sort(fit_order[:n_rows])
+        
+        if algorithm == "random_forest":
+            estimator = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=1)
+        elif algorithm == "sgd":
+            estimator = SGDClassifier(loss="log_loss", random_state=42)
+        else:
+            estimator = LogisticRegression(random_state=42, max_iter=1000)
+        estimator.set_params(**candidate)
+        
+        start = time.perf_counter()
+        estimator.fit(X[rows], y[rows])
+        fit_seconds = time.perf_counter() - start
+        score = float(np.mean(estimator.predict(X[validation_rows]) == y[validation_rows]))
+        return score, fit_seconds
+    
+    # Successive halving: keep the best 1/eta of the candidates on eta times the rows
+    entries = [{'params': c, 'rungs': []} for c in candidates]
+    survivors = list(range(len(entries)))
+    n_rows = min(min_rows, len(fit_order))
+    rung = 0
+    with Parallel(n_jobs=n_workers) as parallel:
+        while True:
+            perf.start(f'rung_{rung}')
+            results = parallel(delayed(evaluate)(entries[i]['params'], n_rows) for i in survivors)
+            for i, (score, fit_seconds) in zip(survivors, results):
+                entries[i]['rungs'].append({'rows': int(n_rows), 'score': score, 'fit_seconds': fit_seconds})
+            print(f"Rung {rung}: {len(survivors)} candidates on {n_rows} rows, "
+                  f"best accuracy {max(score for score, _ in results):.4f}")
+            
+            if len(survivors) == 1 or n_rows == len(fit_order):
+                break
+            survivors.sort(key=lambda i: entries[i]['rungs'][-1]['score'], reverse=True)
+            survivors = survivors[:max(1, math.ceil(len(survivors) / eta))]
+            n_rows = min(n_rows * eta, len(fit_order))
+            rung += 1
+    
+    # Rank by the last rung reached, then by the score there
+    ranking = sorted(entries, key=lambda e: (len(e['rungs']), e['rungs'][-1]['score']), reverse=True)
+    best = ranking[0]
+    best_score = best['rungs'][-1]['score']
+    
+    leaderboard.log_metric('best_score', best_score)
+    leaderboard.log_metric('candidates', len(entries))
+    leaderboard.log_metric('rungs', rung + 1)
+    with open(leaderboard.path, 'w') as f:
+        json.dump({
+            'algorithm': algorithm,
+            'eta': eta,
+            'best_params': best['params'],
+            'best_score': best_score,
+            'leaderboard': [
+                {'rank': rank, 'final_score': e['rungs'][-1]['score'], **e}
+                for rank, e in enumerate(ranking, 1)
+            ]
+        }, f, indent=2)
+    perf.write(performance)
+    
+    print(f"Best {algorithm} parameters: {best['params']} (validation accuracy {best_score:.4f})")
+    return SweepOutput(json.dumps(best['params']), best_score)
+
+# Component for model validation
+@component(
+    base_image="python:3.9",
+    target_image=COMPONENT_IMAGE,
+    packages_to_install=[
+        "scikit-learn==1.3.2",
+        "numpy==1.25.2",
+        "joblib==1.3.2"
+    ]
+)
+def validate_model(
+    model: Input[Model],
+    metrics: Input[Metrics],
+    processed_data: Input[Dataset],
+    validation: Output[Metrics],
+    performance: Output[Metrics],
+    accuracy_threshold: float = 0.8,
+    max_latency_ms: float = 0.0,
+    min_rows_per_sec: float = 0.0,
+    batch_size: int = 10000,
+    n_threads: int = 1,
+    latency_samples: int = 200
+) -> bool:
+    """
+    Validate if the model meets the minimum requirements
+    
+    The model scores the held-out test set in ``batch_size`` chunks read from the
+    memory-mapped arrays, optionally on ``n_threads`` threads, and is gated on:
+    - accuracy on the held-out set >= ``accuracy_threshold``
+    - p95 single-row predict latency <= ``max_latency_ms`` (0 disables)
+    - batched scoring throughput >= ``min_rows_per_sec`` (0 disables)
+    
+    Accuracy per class, batch and single-row latency percentiles and throughput
+    are written to ``validation``. An empty test set fails the gate.
+    """
+    
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    import json
+    import joblib
+    import os
+    import time
+    from instrumentation import PhaseRecorder
+    
+    perf = PhaseRecorder('validate_model')
+    
+    # Load metrics
+    perf.start('load_metrics')
+    with open(metrics.path, 'r') as f:
+        metrics_data = json.load(f)
+    
+    # Load model and memory-map the held-out set
+    perf.start('load_model')
+    model_obj = joblib.load(model.path)
+    X_test = np.load(os.path.join(processed_data.path, 'X_test.npy'), mmap_mode='r')
+    y_test = np.load(os.path.join(processed_data.path, 'y_test.npy'), mmap_mode='r')
+    
+    # Nothing to score, e.g. with a test_size too small to hold out a single row
+    if not len(X_test):
+        failure = "test set is empty; increase test_size"
+        validation.log_metric('accuracy', 0.0)
+        with open(validation.path, 'w') as f:
+            json.dump({'passed': False, 'failures': [failure], 'test_rows': 0,
+                       'train_reported_accuracy': metrics_data['accuracy']}, f)
+        perf.write(performance)
+        print(f"Model validation failed! {failure}")
+        return False
+    
+    # Score the held-out set in bounded-memory batches
+    perf.start('score')
+    def score_batch(start):
+        batch_start = time.perf_counter()
+        predictions = model_obj.predict(X_test[start:start + batch_size])
+        return predictions, time.perf_counter() - batch_start
+    
+    batch_starts = range(0, len(X_test), batch_size)
+    score_start = time.perf_counter()
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            scored = list(executor.map(score_batch, batch_starts))
+    else:
+        scored = [score_batch(start) for start in batch_starts]
+    score_seconds = time.perf_counter() - score_start
+    
+    y_pred = np.concatenate([predictions for predictions, _ in scored])
+    batch_latencies_ms = np.array([seconds for _, seconds in scored]) * 1000
+    rows_per_sec = len(X_test) / score_seconds if score_seconds > 0 else float(len(X_test))
+    
+    correct = y_pred == y_test
+    accuracy = float(correct.mean())
+    
+    # Accuracy sliced by true class
+    classes, class_index = np.unique(y_test, return_inverse=True)
+    class_rows = np.bincount(class_index)
+    class_accuracy = np.bincount(class_index, weights=correct) / class_rows
+    
+    # Single-row latency, as seen by online serving requests
+    perf.start('latency')
+    sample_rows = np.linspace(0, len(X_test) - 1, min(latency_samples, len(X_test))).astype(int)
+    row_latencies_ms = []
+    for row in sample_rows:
+        row_start = time.perf_counter()
+        model_obj.predict(X_test[row:row + 1])
+        row_latencies_ms.append((time.perf_counter() - row_start) * 1000)
+    row_p50, row_p95, row_p99 = (float(v) for v in np.percentile(row_latencies_ms, [50, 95, 99]))
+    batch_p50, batch_p95, batch_p99 = (float(v) for v in np.percentile(batch_latencies_ms, [50, 95, 99]))
+    
+    # Check if model meets requirements
+    failures = []
+    if accuracy < accuracy_threshold:
+        failures.append(f"accuracy {accuracy:.4f} < {accuracy_threshold}")
+    if max_latency_ms > 0 and row_p95 > max_latency_ms:
+        failures.append(f"p95 latency {row_p95:.2f}ms > {max_latency_ms}ms")
+    if min_rows_per_sec > 0 and rows_per_sec < min_rows_per_sec:
+        failures.append(f"throughput {rows_per_sec:.0f} rows/s < {min_rows_per_sec}")
+    passed = not failures
+    
+    report = {
+        'passed': passed,
+        'failures': failures,
+        'accuracy': accuracy,
+        'train_reported_accuracy': metrics_data['accuracy'],
+        'test_rows': len(X_test),
+        'rows_per_sec': rows_per_sec,
+        'batch_size': batch_size,
+        'batch_latency_ms': {'p50': batch_p50, 'p95': batch_p95, 'p99': batch_p99},
+        'row_latency_ms': {'p50': row_p50, 'p95': row_p95, 'p99': row_p99},
+        'class_accuracy': {
+            str(label): {'accuracy': float(acc), 'rows': int(rows)}
+            for label, acc, rows in zip(classes.tolist(), class_accuracy, class_rows)
+        }
+    }
+    
+    for name in ['accuracy', 'rows_per_sec']:
+        validation.log_metric(name, report[name])
+    for percentile in ['p50', 'p95', 'p99']:
+        validation.log_metric(f'row_latency_{percentile}_ms', report['row_latency_ms'][percentile])
+        validation.log_metric(f'batch_latency_{percentile}_ms', report['batch_latency_ms'][percentile])
+    for label, values in report['class_accuracy'].items():
+        validation.log_metric(f'class_{label}_accuracy', values['accuracy'])
+    with open(validation.path, 'w') as f:
+        json.dump(report, f)
+    
+    perf.write(performance)
+    
+    print(f"Scored {len(X_test)} rows at {rows_per_sec:.0f} rows/s, "
+          f"single-row latency p50/p95/p99: {row_p50:.2f}/{row_p95:.2f}/{row_p99:.2f} ms")
+    if passed:
+        print(f"Model validation passed! Accuracy: {accuracy:.4f}")
+    else:
+        print(f"Model validation failed! {'; '.join(failures)}")
+    return passed
+
+# Component for model deployment preparation
+@component(
+    base_image="python:3.9",
+    target_image=COMPONENT_IMAGE,
+    packages_to_install=[
+        "google-cloud-storage==2.14.0",
+        "requests==2.31.0",
+        "scikit-learn==1.3.2",
+        "numpy==1.25.2",
+        "joblib==1.3.2"
+    ]
+)
+def prepare_deployment(
+    model: Input[Model],
+    processed_data: Input[Dataset],
+    serving_profile: Output[Metrics],
+    performance: Output[Metrics],
+    bucket_name: str,
+    model_name: str = "sample-ml-model",
+    batch_sizes: list = [1, 8, 32, 128, 512],
+    latency_repeats: int = 50,
+    latency_budget_ms: float = 0.0,
+    target_rows_per_sec: float = 0.0,
+    export_compact: bool = True,
+    export_bundle: bool = True,
+    min_match_rate: float = 0.9999
+) -> str:
+    """
+    Prepare model for deployment
+    
+    Alongside the model, a serving profile is uploaded to
+    ``deployments/<model_name>/serving_profile.json`` (and written to
+    ``serving_profile``): model load time, memory footprint after load, predict
+    latency p50/p95/p99 and throughput for each of ``batch_sizes``, and a
+    recommended batch size. The recommendation is the largest batch size whose
+    p95 latency fits ``latency_budget_ms``, or without a budget the smallest
+    batch size reaching 90% of the best throughput. With ``target_rows_per_sec``
+    the profile also suggests a replica count.
+    
+    With ``export_compact``, tree ensembles and linear models are also exported
+    as ``model_compact.npz``: flat NumPy arrays (float32 thresholds) that load
+    without unpickling and are served by compact_model.CompactModel. With
+    ``export_bundle``, ``model_bundle.npz`` additionally folds the fitted
+    StandardScaler from preprocessing.json into the thresholds / coefficients
+    and carries the fitted imputation and categorical encoding, so serving
+    predicts on raw rows (missing values included) in one pass. Each export is only
+    uploaded if it agrees with the original model on at least
+    ``min_match_rate`` of the held-out rows.
+    """
+    
+    import numpy as np
+    import joblib
+    import json
+    import math
+    import os
+    import tempfile
+    import time
+    import compact_model
+    from instrumentation import PhaseRecorder
+    from gcs_transfer import upload_files
+    
+    perf = PhaseRecorder('prepare_deployment')
+    
+    def rss_mb():
+        try:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return 0.0
+    
+    # Cold-load the model the way a serving pod would
+    perf.start('load_model')
+    rss_before_load = rss_mb()
+    load_start = time.perf_counter()
+    model_obj = joblib.load(model.path)
+    load_seconds = time.perf_counter() - load_start
+    model_memory_mb = max(0.0, rss_mb() - rss_before_load)
+    
+    # Predict latency at each batch size, on rows from the held-out set
+    perf.start('latency')
+    X_test = np.load(os.path.join(processed_data.path, 'X_test.npy'), mmap_mode='r')
+    batches = {}
+    for size in sorted(set(int(b) for b in batch_sizes)):
+        X_batch = np.resize(X_test[:size], (size, X_test.shape[1]))
+        model_obj.predict(X_batch)  # warm-up
+        latencies_ms = []
+        for _ in range(latency_repeats):
+            start = time.perf_counter()
+            model_obj.predict(X_batch)
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+        p50, p95, p99 = (float(v) for v in np.percentile(latencies_ms, [50, 95, 99]))
+        batches[size] = {
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'rows_per_sec': size / (p50 / 1000) if p50 > 0 else None
+        }
+    
+    best_rows_per_sec = max(b['rows_per_sec'] or 0 for b in batches.values())
+    if latency_budget_ms > 0:
+        within_budget = [size for size, b in batches.items() if b['p95_ms'] <= latency_budget_ms]
+        recommended_batch_size = max(within_budget) if within_budget else min(batches)
+    else:
+        recommended_batch_size = min(
+            size for size, b in batches.items() if (b['rows_per_sec'] or 0) >= 0.9 * best_rows_per_sec
+        )
+    replica_rows_per_sec = batches[recommended_batch_size]['rows_per_sec']
+    
+    profile = {
+        'model_name': model_name,
+        'model_file_mb': os.path.getsize(model.path) / 1024 / 1024,
+        'load_seconds': load_seconds,
+        'model_memory_mb': model_memory_mb,
+        'process_rss_mb': rss_mb(),
+        'batches': {str(size): values for size, values in batches.items()},
+        'recommended_batch_size': recommended_batch_size,
+        'replica_rows_per_sec': replica_rows_per_sec,
+        'latency_budget_ms': latency_budget_ms
+    }
+    if target_rows_per_sec > 0 and replica_rows_per_sec:
+        profile['target_rows_per_sec'] = target_rows_per_sec
+        profile['suggested_replicas'] = max(1, math.ceil(target_rows_per_sec / replica_rows_per_sec))
+    
+    for name in ['load_seconds', 'model_memory_mb', 'recommended_batch_size', 'replica_rows_per_sec']:
+        serving_profile.log_metric(name, profile[name])
+    for size, values in batches.items():
+        serving_profile.log_metric(f'batch_{size}_p95_ms', values['p95_ms'])
+    
+    print(f"Model loads in {load_seconds:.3f}s using {model_memory_mb:.1f} MiB; "
+          f"recommended batch size {recommended_batch_size} "
+          f"({batches[recommended_batch_size]['p95_ms']:.2f} ms p95)")
+    
+    with open(os.path.join(processed_data.path, 'preprocessing.json')) as f:
+        preprocessing = json.load(f)
+    
+    # Compact model on scaled features, and a bundle with the scaler and transform
+    # folded in that takes raw rows; the held-out set is mapped back to raw rows
+    # to check the bundle
+    exports = {}
+    try:
+        if export_compact:
+            exports['compact'] = (compact_model.export_arrays(model_obj), lambda batch: batch)
+        if export_bundle:
+            exports['bundle'] = (
+                compact_model.export_arrays(model_obj, preprocessing['scaler'],
+                                            preprocessing['feature_names'], preprocessing.get('transform')),
+                lambda batch: compact_model.raw_features(batch, preprocessing)
+            )
+    except TypeError as e:
+        print(f"Skipping compact exports: {e}")
+        exports = {}
+    
+    deployment_path = f"deployments/{model_name}/model.joblib"
+    deployment_files = {model.path: deployment_path}
+    export_dir = tempfile.mkdtemp()
+    for name, (arrays, to_input) in exports.items():
+        perf.start(f'export_{name}')
+        export_path = os.path.join(export_dir, f'model_{name}.npz')
+        compact_model.save(export_path, arrays)
+        
+        load_start = time.perf_counter()
+        compact = compact_model.load(export_path)
+        export_load_seconds = time.perf_counter() - load_start
+        
+        matches = 0
+        for start in range(0, len(X_test), 10000):
+            batch = X_test[start:start + 10000]
+            matches += int(np.sum(model_obj.predict(batch) == compact.predict(to_input(batch))))
+        match_rate = matches / len(X_test) if len(X_test) else 1.0
+        
+        profile[name] = {
+            'file_mb': os.path.getsize(export_path) / 1024 / 1024,
+            'load_seconds': export_load_seconds,
+            'match_rate': match_rate,
+            'uploaded': match_rate >= min_match_rate
+        }
+        serving_profile.log_metric(f'{name}_file_mb', profile[name]['file_mb'])
+        serving_profile.log_metric(f'{name}_load_seconds', export_load_seconds)
+        serving_profile.log_metric(f'{name}_match_rate', match_rate)
+        
+        if match_rate >= min_match_rate:
+            deployment_files[export_path] = f"deployments/{model_name}/model_{name}.npz"
+            print(f"Exported model_{name}.npz: {profile[name]['file_mb']:.2f} MiB "
+                  f"(joblib {profile['model_file_mb']:.2f} MiB), loads in {export_load_seconds:.3f}s")
+        else:
+            print(f"model_{name}.npz predictions differ on {1 - match_rate:.4%} of rows, not uploading it")
+    
+    with open(serving_profile.path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    
+    # Upload model and its serving profile to the final deployment location
+    perf.start('upload')
+    deployment_files[serving_profile.path] = f"deployments/{model_name}/serving_profile.json"
+    upload_files(bucket_name, deployment_files)
+    perf.write(performance)
+    
+    model_uri = f"gs://{bucket_name}/{deployment_path}"
+    
+    print(f"Model prepared for deployment at: {model_uri}")
+    return model_uri
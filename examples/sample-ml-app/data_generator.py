@@ -5,9 +5,140 @@ Generate sample data for the ML pipeline demonstration
 import pandas as pd
 import numpy as np
 from sklearn.datasets import make_classification
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
 import os
 
-def generate_sample_data(n_samples=1000, n_features=10, n_classes=2, output_file="sample_data.csv"):
+# Supported output formats and their default file extensions
+OUTPUT_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'npy': '.npy'
+}
+
+# Data-quality corruption applied by default: 5% missing values in the first 3 features
+DEFAULT_CORRUPTION = {'missing_rate': [0.05, 0.05, 0.05]}
+
+def _infer_output_format(output_file):
+    """Infer the output format from a file extension, defaulting to CSV"""
+    extension = os.path.splitext(output_file)[1].lower()
+    aliases = {'.pq': 'parquet', '.arrow': 'feather'}
+    for output_format, format_extension in OUTPUT_FORMATS.items():
+        if extension == format_extension:
+            return output_format
+    return aliases.get(extension, 'csv')
+
+class _DatasetWriter:
+    """
+    Incrementally write DataFrame chunks as CSV, Parquet, Feather or NPY
+
+    Binary formats store float columns as float32. Each chunk becomes one
+    Parquet row group or Arrow record batch; NPY output is a structured array
+    preallocated with ``n_rows`` rows and filled in place through a memmap.
+    """
+
+    def __init__(self, output_file, output_format=None, n_rows=None):
+        self.output_file = output_file
+        self.output_format = output_format or _infer_output_format(output_file)
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {self.output_format}")
+        if self.output_format == 'npy' and n_rows is None:
+            raise ValueError("NPY output requires the total number of rows up front")
+
+        self.n_rows = n_rows
+        self.rows_written = 0
+        self._writer = None
+
+    def write(self, df):
+        if self.output_format == 'csv':
+            first = self.rows_written == 0
+            df.to_csv(self.output_file, mode='w' if first else 'a', header=first, index=False)
+            self.rows_written += len(df)
+            return
+
+        float_columns = df.select_dtypes(include='float64').columns
+        df = df.astype({col: np.float32 for col in float_columns})
+
+        if self.output_format == 'npy':
+            if self._writer is None:
+                dtype = np.dtype([(col, df[col].dtype) for col in df.columns])
+                self._writer = np.lib.format.open_memmap(
+                    self.output_file, mode='w+', dtype=dtype, shape=(self.n_rows,)
+                )
+            block = self._writer[self.rows_written:self.rows_written + len(df)]
+            for col in df.columns:
+                block[col] = df[col].to_numpy()
+        else:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.output_format == 'parquet':
+                import pyarrow.parquet as pq
+
+                if self._writer is None:
+                    self._writer = pq.ParquetWriter(self.output_file, table.schema)
+                self._writer.write_table(table, row_group_size=len(df))
+            else:
+                if self._writer is None:
+                    self._writer = pa.ipc.new_file(
+                        self.output_file, table.schema,
+                        options=pa.ipc.IpcWriteOptions(compression='lz4')
+                    )
+                self._writer.write_table(table, max_chunksize=len(df))
+
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._writer is None:
+            return
+        if self.output_format == 'npy':
+            self._writer.flush()
+        else:
+            self._writer.close()
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _write_dataframe(df, output_file, output_format=None):
+    """Write a complete DataFrame in the given (or inferred) format"""
+    with _DatasetWriter(output_file, output_format, n_rows=len(df)) as writer:
+        writer.write(df)
+
+def read_dataset(path):
+    """
+    Read a dataset written by this module, detecting its format from the file contents
+
+    Args:
+        path: A CSV, Parquet, Feather or NPY file, or a directory of shards
+            with a manifest.json written by generate_sample_data_parallel
+    """
+    if os.path.isdir(path):
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        return pd.concat(
+            [read_dataset(os.path.join(path, shard['file'])) for shard in manifest['shards']],
+            ignore_index=True
+        )
+
+    with open(path, 'rb') as f:
+        magic = f.read(6)
+
+    if magic.startswith(b'PAR1'):
+        return pd.read_parquet(path)
+    if magic.startswith(b'ARROW1'):
+        return pd.read_feather(path)
+    if magic.startswith(b'\x93NUMPY'):
+        return pd.DataFrame(np.load(path))
+    return pd.read_csv(path)
+
+def generate_sample_data(n_samples=1000, n_features=10, n_classes=2, output_file="sample_data.csv",
+                         output_format=None, random_state=42, corruption=None):
     """
     Generate sample classification data for the ML pipeline
     
@@ -15,7 +146,10 @@ def generate_sample_data(n_samples=1000, n_features=10, n_classes=2, output_file
         n_samples: Number of samples to generate
         n_features: Number of features
         n_classes: Number of target classes
-        output_file: Output CSV file name
+        output_file: Output file name
+        output_format: One of OUTPUT_FORMATS (default: inferred from output_file)
+        random_state: Seed for the data and the corruption stage
+        corruption: Keyword arguments for corrupt_data (default: DEFAULT_CORRUPTION)
     """
     
     # Generate synthetic classification data
@@ -25,10 +159,14 @@ def generate_sample_data(n_samples=1000, n_features=10, n_classes=2, output_file
         n_classes=n_classes,
         n_redundant=2,
         n_informative=8,
-        random_state=42,
+        random_state=random_state,
         flip_y=0.1
     )
     
+    # Add realistic missing values, outliers, label noise and duplicates
+    corrupt_data(X, y, np.random.default_rng(random_state), n_classes,
+                 **(DEFAULT_CORRUPTION if corruption is None else corruption))
+    
     # Create feature names
     feature_names = [f'feature_{i}' for i in range(n_features)]
     
@@ -36,14 +174,8 @@ def generate_sample_data(n_samples=1000, n_features=10, n_classes=2, output_file
     df = pd.DataFrame(X, columns=feature_names)
     df['target'] = y
     
-    # Add some realistic noise and missing values
-    # Add 5% missing values randomly
-    for col in feature_names[:3]:  # Add missing values to first 3 features
-        missing_idx = np.random.choice(df.index, size=int(0.05 * len(df)), replace=False)
-        df.loc[missing_idx, col] = np.nan
-    
-    # Save to CSV
-    df.to_csv(output_file, index=False)
+    # Save to disk
+    _write_dataframe(df, output_file, output_format)
     print(f"Generated {n_samples} samples with {n_features} features")
     print(f"Data saved to {output_file}")
     print(f"Data shape: {df.shape}")
@@ -51,94 +183,456 @@ def generate_sample_data(n_samples=1000, n_features=10, n_classes=2, output_file
     
     return df
 
-def generate_time_series_data(n_samples=1000, output_file="time_series_data.csv"):
+def corrupt_data(X, y, rng, n_classes=None, missing_rate=0.0, outlier_rate=0.0, outlier_scale=10.0,
+                 label_noise=0.0, duplicate_rate=0.0):
+    """
+    Inject data-quality problems into a feature matrix and labels, in place
+
+    Every corruption is drawn from ``rng`` with vectorized masks over the whole
+    array, so the cost is a few passes over the data and the result is
+    reproducible for a given seed.
+
+    Args:
+        X: Float feature matrix of shape (n_rows, n_features)
+        y: Integer label vector of length n_rows
+        rng: numpy.random.Generator to draw from
+        n_classes: Number of target classes (default: inferred from y)
+        missing_rate: Fraction of values set to NaN; a scalar for every feature,
+            or a sequence of per-feature rates for the first len(sequence) features
+        outlier_rate: Fraction of feature values shifted by +/- outlier_scale
+            standard deviations of their column
+        outlier_scale: Outlier distance in column standard deviations
+        label_noise: Fraction of labels replaced by a different random class
+        duplicate_rate: Fraction of rows overwritten with exact copies of other rows
+
+    Returns:
+        Tuple (X, y) of the corrupted arrays
+    """
+    n_rows, n_features = X.shape
+
+    if label_noise > 0:
+        n_classes = n_classes or int(y.max()) + 1
+        noisy = np.flatnonzero(rng.random(n_rows) < label_noise)
+        # Shifting by 1..n_classes-1 always lands on a different class
+        y[noisy] = (y[noisy] + rng.integers(1, n_classes, size=len(noisy))) % n_classes
+
+    if outlier_rate > 0:
+        rows, cols = np.nonzero(rng.random((n_rows, n_features)) < outlier_rate)
+        signs = rng.choice([-1.0, 1.0], size=len(rows))
+        X[rows, cols] += signs * outlier_scale * X.std(axis=0)[cols]
+
+    rates = np.zeros(n_features)
+    if np.ndim(missing_rate) == 0:
+        rates[:] = missing_rate
+    else:
+        per_feature = np.asarray(missing_rate, dtype=float)[:n_features]
+        rates[:len(per_feature)] = per_feature
+    cols = np.flatnonzero(rates)
+    if len(cols):
+        rows, idx = np.nonzero(rng.random((n_rows, len(cols))) < rates[cols])
+        X[rows, cols[idx]] = np.nan
+
+    # Last, so duplicates are exact copies including their missing values
+    if duplicate_rate > 0:
+        targets = np.flatnonzero(rng.random(n_rows) < duplicate_rate)
+        sources = rng.integers(n_rows, size=len(targets))
+        X[targets] = X[sources]
+        y[targets] = y[sources]
+
+    return X, y
+
+def _build_classification_model(n_features, n_classes, n_informative=8, n_redundant=2,
+                                n_clusters_per_class=2, class_sep=1.0, random_state=42):
+    """
+    Draw the fixed parameters of a make_classification-style generative model
+
+    Centroids, per-cluster covariance transforms, redundant feature mixing and
+    the feature permutation are drawn once from ``random_state`` so that every
+    chunk sampled from the model shares the same class/feature semantics.
+    """
+    if n_informative + n_redundant > n_features:
+        raise ValueError("n_informative + n_redundant must not exceed n_features")
+
+    rng = np.random.default_rng(random_state)
+    n_clusters = n_classes * n_clusters_per_class
+    if n_clusters > 2 ** n_informative:
+        raise ValueError("n_classes * n_clusters_per_class must be <= 2**n_informative")
+
+    # Distinct hypercube vertices become the cluster centroids
+    vertices = set()
+    while len(vertices) < n_clusters:
+        vertices.add(tuple(rng.integers(0, 2, size=n_informative)))
+    centroids = np.array(sorted(vertices), dtype=np.float64) * 2 * class_sep - class_sep
+
+    return {
+        'n_features': n_features,
+        'n_classes': n_classes,
+        'n_informative': n_informative,
+        'n_redundant': n_redundant,
+        'centroids': centroids,
+        'covariances': 2 * rng.uniform(size=(n_clusters, n_informative, n_informative)) - 1,
+        'redundant': 2 * rng.uniform(size=(n_informative, n_redundant)) - 1,
+        'feature_order': rng.permutation(n_features),
+    }
+
+def _sample_classification_chunk(model, n_rows, rng, flip_y=0.1):
+    """Sample ``n_rows`` rows (features, labels) from a model built by _build_classification_model"""
+    n_informative = model['n_informative']
+    n_redundant = model['n_redundant']
+    n_clusters = len(model['centroids'])
+
+    clusters = rng.integers(n_clusters, size=n_rows)
+    y = clusters % model['n_classes']
+
+    X = np.empty((n_rows, model['n_features']))
+    X_inf = rng.standard_normal(size=(n_rows, n_informative))
+    # Apply each cluster's random covariance and shift it to its vertex
+    X_inf = np.einsum('ni,nij->nj', X_inf, model['covariances'][clusters])
+    X_inf += model['centroids'][clusters]
+    X[:, :n_informative] = X_inf
+
+    if n_redundant > 0:
+        X[:, n_informative:n_informative + n_redundant] = X_inf @ model['redundant']
+
+    n_random = model['n_features'] - n_informative - n_redundant
+    if n_random > 0:
+        X[:, -n_random:] = rng.standard_normal(size=(n_rows, n_random))
+
+    # Randomly replace labels
+    flip_mask = rng.uniform(size=n_rows) < flip_y
+    y[flip_mask] = rng.integers(model['n_classes'], size=flip_mask.sum())
+
+    return X[:, model['feature_order']], y
+
+def iter_sample_data_chunks(n_samples=1000, n_features=10, n_classes=2, chunk_size=100_000,
+                            random_state=42, start_chunk=0, stop_chunk=None, corruption=None):
+    """
+    Generate sample classification data as a stream of fixed-size DataFrame chunks
+
+    Each chunk is seeded from ``(random_state, chunk_index)``, so chunk ``i`` is
+    identical no matter how many chunks are consumed before it or by whom.
+    Peak memory is bounded by ``chunk_size`` rather than ``n_samples``.
+
+    Args:
+        n_samples: Total number of samples across all chunks
+        n_features: Number of features
+        n_classes: Number of target classes
+        chunk_size: Number of rows per chunk (the last chunk may be shorter)
+        random_state: Seed for the generative model and the per-chunk streams
+        start_chunk: Index of the first chunk to yield
+        stop_chunk: Index one past the last chunk to yield (default: all chunks)
+        corruption: Keyword arguments for corrupt_data (default: DEFAULT_CORRUPTION)
+
+    Yields:
+        DataFrames with ``feature_*`` columns and a ``target`` column
+    """
+    model = _build_classification_model(n_features, n_classes, random_state=random_state)
+    corruption = DEFAULT_CORRUPTION if corruption is None else corruption
+    feature_names = [f'feature_{i}' for i in range(n_features)]
+
+    n_chunks = -(-n_samples // chunk_size)
+    if stop_chunk is None:
+        stop_chunk = n_chunks
+
+    for chunk_index in range(start_chunk, min(stop_chunk, n_chunks)):
+        rng = np.random.default_rng([random_state, chunk_index])
+        n_rows = min(chunk_size, n_samples - chunk_index * chunk_size)
+
+        X, y = _sample_classification_chunk(model, n_rows, rng)
+        corrupt_data(X, y, rng, n_classes, **corruption)
+
+        df = pd.DataFrame(X, columns=feature_names)
+        df['target'] = y
+        df.index += chunk_index * chunk_size
+
+        yield df
+
+def generate_sample_data_streaming(n_samples=1000, n_features=10, n_classes=2,
+                                   output_file="sample_data.csv", chunk_size=100_000,
+                                   random_state=42, output_format=None, corruption=None):
+    """
+    Generate sample classification data chunk by chunk, appending each chunk to disk
+
+    Unlike generate_sample_data, the full dataset is never held in memory, so
+    this is the mode to use for stress datasets of millions of rows.
+
+    Args:
+        n_samples: Number of samples to generate
+        n_features: Number of features
+        n_classes: Number of target classes
+        output_file: Output file name
+        chunk_size: Number of rows generated and written at a time
+            (and the Parquet row group / Arrow record batch size)
+        random_state: Seed for reproducible output
+        output_format: One of OUTPUT_FORMATS (default: inferred from output_file)
+        corruption: Keyword arguments for corrupt_data (default: DEFAULT_CORRUPTION)
+
+    Returns:
+        Summary dict with the row count, target distribution and missing values
+    """
+    summary = _write_chunks(
+        iter_sample_data_chunks(n_samples, n_features, n_classes, chunk_size, random_state,
+                                corruption=corruption),
+        _DatasetWriter(output_file, output_format, n_rows=n_samples)
+    )
+
+    print(f"Generated {summary['rows']} samples with {n_features} features in chunks of {chunk_size}")
+    print(f"Data saved to {output_file}")
+    print(f"Target distribution: {summary['target_distribution']}")
+
+    summary['features'] = n_features
+    summary['output_file'] = output_file
+    return summary
+
+def _write_chunks(chunks, writer):
+    """Write DataFrame chunks with a _DatasetWriter and return row/target/missing-value counts"""
+    target_counts = {}
+    missing_values = 0
+    rows = 0
+
+    with writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+            rows += len(chunk)
+            missing_values += int(chunk.isnull().sum().sum())
+            for label, count in chunk['target'].value_counts().items():
+                target_counts[int(label)] = target_counts.get(int(label), 0) + int(count)
+
+    return {
+        'rows': rows,
+        'target_distribution': dict(sorted(target_counts.items())),
+        'missing_values': missing_values
+    }
+
+def _generate_shard(shard_spec):
+    """Generate one shard of a sharded dataset (runs in a worker process)"""
+    params = shard_spec['params']
+    shard_rows = (min(shard_spec['stop_chunk'] * params['chunk_size'], params['n_samples'])
+                  - shard_spec['start_chunk'] * params['chunk_size'])
+    summary = _write_chunks(
+        iter_sample_data_chunks(
+            params['n_samples'], params['n_features'], params['n_classes'],
+            params['chunk_size'], params['random_state'],
+            start_chunk=shard_spec['start_chunk'], stop_chunk=shard_spec['stop_chunk'],
+            corruption=params['corruption']
+        ),
+        _DatasetWriter(shard_spec['path'], shard_spec['output_format'], n_rows=shard_rows)
+    )
+    summary['file'] = os.path.basename(shard_spec['path'])
+    summary['first_row'] = shard_spec['start_chunk'] * params['chunk_size']
+    summary['chunks'] = [shard_spec['start_chunk'], shard_spec['stop_chunk']]
+    return summary
+
+def generate_sample_data_parallel(n_samples=1000, n_features=10, n_classes=2,
+                                  output_dir="sample_datasets/sharded", n_shards=None,
+                                  n_workers=None, chunk_size=100_000, random_state=42,
+                                  output_format='csv', corruption=None):
+    """
+    Generate a large classification dataset as shard files using a process pool
+
+    The dataset is split on chunk boundaries into ``n_shards`` contiguous shards
+    that are generated concurrently. Because every chunk is seeded by its index
+    (see iter_sample_data_chunks), concatenating the shards in manifest order
+    yields the same rows as generate_sample_data_streaming with the same
+    ``chunk_size`` and ``random_state``, whatever the shard or worker count.
+
+    Args:
+        n_samples: Total number of samples to generate
+        n_features: Number of features
+        n_classes: Number of target classes
+        output_dir: Directory for the shard files and manifest.json
+        n_shards: Number of shard files (default: one per CPU core)
+        n_workers: Number of worker processes (default: one per CPU core)
+        chunk_size: Number of rows generated at a time within a shard
+        random_state: Seed for reproducible output
+        output_format: Shard file format, one of OUTPUT_FORMATS
+        corruption: Keyword arguments for corrupt_data (default: DEFAULT_CORRUPTION)
+
+    Returns:
+        The manifest dict, also written to ``output_dir/manifest.json``
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    n_chunks = -(-n_samples // chunk_size)
+    n_shards = max(1, min(n_shards or n_workers, n_chunks))
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    params = {
+        'n_samples': n_samples,
+        'n_features': n_features,
+        'n_classes': n_classes,
+        'chunk_size': chunk_size,
+        'random_state': random_state,
+        'corruption': DEFAULT_CORRUPTION if corruption is None else corruption
+    }
+    boundaries = np.linspace(0, n_chunks, n_shards + 1).astype(int)
+    shard_specs = [
+        {
+            'params': params,
+            'path': os.path.join(output_dir, f'part-{i:05d}{OUTPUT_FORMATS[output_format]}'),
+            'output_format': output_format,
+            'start_chunk': int(boundaries[i]),
+            'stop_chunk': int(boundaries[i + 1])
+        }
+        for i in range(n_shards)
+    ]
+
+    with ProcessPoolExecutor(max_workers=min(n_workers, n_shards)) as executor:
+        shards = list(executor.map(_generate_shard, shard_specs))
+
+    target_counts = {}
+    for shard in shards:
+        for label, count in shard['target_distribution'].items():
+            target_counts[label] = target_counts.get(label, 0) + count
+
+    manifest = {
+        'generator': 'generate_sample_data_parallel',
+        'params': params,
+        'format': output_format,
+        'rows': sum(shard['rows'] for shard in shards),
+        'target_distribution': dict(sorted(target_counts.items())),
+        'shards': shards
+    }
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Generated {manifest['rows']} samples in {n_shards} shards using {min(n_workers, n_shards)} workers")
+    print(f"Shards and manifest saved to {output_dir}")
+    print(f"Target distribution: {manifest['target_distribution']}")
+
+    return manifest
+
+def _lagged(values, lag, start):
+    """Columns ``start:`` of ``values`` shifted right by ``lag`` along the time axis"""
+    return values[:, start - lag:values.shape[1] - lag]
+
+def _rolling_mean(values, window, start):
+    """Trailing ``window``-point means of each row of ``values``, for time points ``start:``"""
+    cumsum = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=cumsum[:, 1:])
+    return (cumsum[:, start + 1:] - cumsum[:, start + 1 - window:values.shape[1] + 1 - window]) / window
+
+def generate_time_series_data(n_samples=1000, output_file="time_series_data.csv", output_format=None,
+                              n_series=1, lags=(1, 7, 30), windows=(7, 30), random_state=42):
     """
     Generate sample time series data for forecasting
     
+    All series are generated together as an (n_series, n_samples) array: trend,
+    seasonality, lags and moving averages (via cumulative sums) are computed
+    with 2-D NumPy operations rather than per-series pandas calls, so panels of
+    thousands of series are cheap to generate.
+    
     Args:
-        n_samples: Number of time points
-        output_file: Output CSV file name
+        n_samples: Number of time points per series
+        output_file: Output file name
+        output_format: One of OUTPUT_FORMATS (default: inferred from output_file)
+        n_series: Number of independent series; more than one adds a series_id column
+        lags: Lags for the value_lag_* features
+        windows: Window sizes for the value_ma_* moving average features
+        random_state: Seed for the per-series parameters and noise
     """
+    rng = np.random.default_rng(random_state)
     
     # Generate time series with trend and seasonality
     time_index = pd.date_range(start='2020-01-01', periods=n_samples, freq='D')
+    t = np.arange(n_samples)
     
-    # Create trend component
-    trend = np.linspace(100, 200, n_samples)
+    # Create trend component (the first series keeps the classic 100 -> 200 trend)
+    level = np.concatenate([[100.0], rng.uniform(50, 150, n_series - 1)])[:, None]
+    growth = np.concatenate([[100.0], rng.uniform(0, 200, n_series - 1)])[:, None]
+    trend = level + growth * t / max(n_samples - 1, 1)
     
     # Create seasonal component (yearly cycle)
-    seasonal = 20 * np.sin(2 * np.pi * np.arange(n_samples) / 365.25)
+    amplitude = np.concatenate([[20.0], rng.uniform(5, 40, n_series - 1)])[:, None]
+    phase = np.concatenate([[0.0], rng.uniform(0, 2 * np.pi, n_series - 1)])[:, None]
+    seasonal = amplitude * np.sin(2 * np.pi * t / 365.25 + phase)
     
-    # Create random noise
-    noise = np.random.normal(0, 5, n_samples)
+    # Create random noise and combine components
+    values = trend + seasonal + rng.normal(0, 5, (n_series, n_samples))
     
-    # Combine components
-    values = trend + seasonal + noise
+    # Rows without a full history for every lag and window are dropped
+    start = max(max(lags, default=0), max(windows, default=1) - 1)
+    dates = time_index[start:]
+    n_rows = len(dates)
     
-    # Create additional features
-    df = pd.DataFrame({
-        'date': time_index,
-        'value': values,
-        'day_of_week': time_index.dayofweek,
-        'month': time_index.month,
-        'quarter': time_index.quarter,
-        'is_weekend': (time_index.dayofweek >= 5).astype(int)
-    })
+    columns = {}
+    if n_series > 1:
+        columns['series_id'] = np.repeat(np.arange(n_series), n_rows)
+    columns['date'] = np.tile(dates.values, n_series)
+    columns['value'] = values[:, start:].ravel()
+    
+    # Calendar features are shared by every series
+    columns['day_of_week'] = np.tile(dates.dayofweek.values, n_series)
+    columns['month'] = np.tile(dates.month.values, n_series)
+    columns['quarter'] = np.tile(dates.quarter.values, n_series)
+    columns['is_weekend'] = np.tile((dates.dayofweek >= 5).astype(int), n_series)
     
     # Create lagged features
-    for lag in [1, 7, 30]:
-        df[f'value_lag_{lag}'] = df['value'].shift(lag)
+    for lag in lags:
+        columns[f'value_lag_{lag}'] = _lagged(values, lag, start).ravel()
     
     # Create moving averages
-    for window in [7, 30]:
-        df[f'value_ma_{window}'] = df['value'].rolling(window=window).mean()
+    for window in windows:
+        columns[f'value_ma_{window}'] = _rolling_mean(values, window, start).ravel()
     
-    # Drop rows with NaN values
-    df = df.dropna()
+    df = pd.DataFrame(columns)
     
-    # Save to CSV
-    df.to_csv(output_file, index=False)
-    print(f"Generated time series data with {len(df)} samples")
+    # Save to disk
+    _write_dataframe(df, output_file, output_format)
+    print(f"Generated time series data with {len(df)} samples across {n_series} series")
     print(f"Data saved to {output_file}")
     print(f"Data shape: {df.shape}")
     
     return df
 
-def create_sample_datasets():
-    """Create multiple sample datasets for different use cases"""
+def create_sample_datasets(parallel=False):
+    """
+    Create multiple sample datasets for different use cases
+
+    Args:
+        parallel: Generate the datasets concurrently in a process pool
+    """
     
     # Create output directory
     os.makedirs("sample_datasets", exist_ok=True)
     
-    # Generate classification data
-    classification_data = generate_sample_data(
-        n_samples=1000,
-        n_features=10,
-        n_classes=2,
-        output_file="sample_datasets/classification_data.csv"
-    )
-    
-    # Generate multi-class classification data
-    multiclass_data = generate_sample_data(
-        n_samples=1500,
-        n_features=15,
-        n_classes=3,
-        output_file="sample_datasets/multiclass_data.csv"
-    )
-    
-    # Generate time series data
-    time_series_data = generate_time_series_data(
-        n_samples=1000,
-        output_file="sample_datasets/time_series_data.csv"
-    )
+    jobs = {
+        # Generate classification data
+        'classification': (generate_sample_data, dict(
+            n_samples=1000,
+            n_features=10,
+            n_classes=2,
+            output_file="sample_datasets/classification_data.csv"
+        )),
+        # Generate multi-class classification data
+        'multiclass': (generate_sample_data, dict(
+            n_samples=1500,
+            n_features=15,
+            n_classes=3,
+            output_file="sample_datasets/multiclass_data.csv"
+        )),
+        # Generate time series data
+        'time_series': (generate_time_series_data, dict(
+            n_samples=1000,
+            output_file="sample_datasets/time_series_data.csv"
+        )),
+        # Generate larger dataset for stress testing
+        'large': (generate_sample_data, dict(
+            n_samples=10000,
+            n_features=20,
+            n_classes=2,
+            output_file="sample_datasets/large_classification_data.csv"
+        )),
+    }
     
-    # Generate larger dataset for stress testing
-    large_data = generate_sample_data(
-        n_samples=10000,
-        n_features=20,
-        n_classes=2,
-        output_file="sample_datasets/large_classification_data.csv"
-    )
+    if parallel:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = {name: executor.submit(func, **kwargs) for name, (func, kwargs) in jobs.items()}
+            datasets = {name: future.result() for name, future in futures.items()}
+    else:
+        datasets = {name: func(**kwargs) for name, (func, kwargs) in jobs.items()}
     
     print("\n=== Sample Datasets Created ===")
     print("Available datasets:")
@@ -147,16 +641,115 @@ def create_sample_datasets():
     print("3. time_series_data.csv - Time series forecasting (1000 time points)")
     print("4. large_classification_data.csv - Large dataset for stress testing (10000 samples, 20 features)")
     
-    return {
-        'classification': classification_data,
-        'multiclass': multiclass_data,
-        'time_series': time_series_data,
-        'large': large_data
-    }
+    return datasets
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Generate sample datasets for the ML pipeline")
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Generate the sample datasets concurrently"
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        help="Generate a single sharded classification dataset with this many samples"
+    )
+    parser.add_argument(
+        "--features",
+        type=int,
+        default=20,
+        help="Number of features for the sharded dataset"
+    )
+    parser.add_argument(
+        "--classes",
+        type=int,
+        default=2,
+        help="Number of target classes for the sharded dataset"
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="sample_datasets/sharded",
+        help="Output directory for the shard files and manifest"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="Number of shard files (default: one per CPU core)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes (default: one per CPU core)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100_000,
+        help="Rows generated at a time within each shard"
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(OUTPUT_FORMATS),
+        default="csv",
+        help="Output format for the sharded dataset"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Random seed for the sharded dataset"
+    )
+    parser.add_argument(
+        "--missing-rate",
+        type=float,
+        nargs="+",
+        default=DEFAULT_CORRUPTION['missing_rate'],
+        help="Missing value rate: one rate for every feature, or rates for the first N features"
+    )
+    parser.add_argument(
+        "--outlier-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of feature values replaced by outliers"
+    )
+    parser.add_argument(
+        "--label-noise",
+        type=float,
+        default=0.0,
+        help="Fraction of labels replaced by a different class"
+    )
+    parser.add_argument(
+        "--duplicate-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of rows overwritten with duplicates of other rows"
+    )
+    
+    args = parser.parse_args()
+    
+    if args.samples:
+        generate_sample_data_parallel(
+            n_samples=args.samples,
+            n_features=args.features,
+            n_classes=args.classes,
+            output_dir=args.output_dir,
+            n_shards=args.shards,
+            n_workers=args.workers,
+            chunk_size=args.chunk_size,
+            random_state=args.seed,
+            output_format=args.format,
+            corruption={
+                'missing_rate': args.missing_rate[0] if len(args.missing_rate) == 1 else args.missing_rate,
+                'outlier_rate': args.outlier_rate,
+                'label_noise': args.label_noise,
+                'duplicate_rate': args.duplicate_rate
+            }
+        )
+        return
+    
     # Create sample datasets
-    datasets = create_sample_datasets()
+    datasets = create_sample_datasets(parallel=args.parallel)
     
     # Display basic statistics
     print("\n=== Dataset Statistics ===")
@@ -166,4 +759,7 @@ if __name__ == "__main__":
         print(f"  Memory usage: {df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB")
         if 'target' in df.columns:
             print(f"  Target distribution: {df['target'].value_counts().to_dict()}")
-        print(f"  Missing values: {df.isnull().sum().sum()}")
\ No newline at end of file
+        print(f"  Missing values: {df.isnull().sum().sum()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Shared Google Cloud Storage transfer helpers for the sample ML pipeline
+
+All transfers in a process reuse one storage client. Large files are uploaded
+and downloaded as concurrent chunks, several files can be transferred in
+parallel, and uploads are skipped when an object with the same CRC32C checksum
+already exists.
+
+Datasets can be uploaded content-addressed (upload_dataset): every file is
+stored once as ``<prefix>/objects/<sha256><ext>``, and a directory of shards
+additionally gets a manifest listing them, so run parameters point at
+immutable URIs. Large uploads use a resumable session whose URL is kept on
+disk, so an interrupted upload continues where it stopped when it is retried,
+even from a new process.
+
+Set LOCAL_GCS_ROOT to a directory to use the local filesystem instead of GCS
+(``<root>/<bucket>/<blob name>``), e.g. for tests and local runs. The
+google-cloud-storage client also honours STORAGE_EMULATOR_HOST, so the same
+code can run against a fake GCS server.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Files at least this large are transferred as concurrent chunks (or as a
+# resumable upload)
+PARALLEL_TRANSFER_THRESHOLD = 64 * 1024 * 1024
+CHUNK_SIZE = 32 * 1024 * 1024
+MAX_WORKERS = 8
+
+# Where resumable upload sessions are remembered between processes
+UPLOAD_STATE_DIR = os.environ.get(
+    "GCS_UPLOAD_STATE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "sample-ml-app", "uploads")
+)
+# Attempts per chunk of a resumable upload before giving up, waiting
+# RETRY_BACKOFF_SECONDS after the first failure and doubling it after each next one
+CHUNK_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 1.0
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide storage client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from google.cloud import storage
+            _client = storage.Client()
+    return _client
+
+def _local_path(bucket_name, blob_name):
+    """Path of an object under LOCAL_GCS_ROOT, or None when using GCS"""
+    local_root = os.environ.get("LOCAL_GCS_ROOT")
+    if not local_root:
+        return None
+    return os.path.join(local_root, bucket_name, blob_name)
+
+def file_crc32c(path):
+    """Base64-encoded CRC32C of a file, in the format GCS reports for objects"""
+    import google_crc32c
+
+    checksum = google_crc32c.Checksum()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            checksum.update(block)
+    return base64.b64encode(checksum.digest()).decode()
+
+def file_digests(path):
+    """SHA-256 hex digest and base64 CRC32C of a file, computed in one read"""
+    import google_crc32c
+
+    sha256 = hashlib.sha256()
+    checksum = google_crc32c.Checksum()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+            checksum.update(block)
+    return sha256.hexdigest(), base64.b64encode(checksum.digest()).decode()
+
+def get_crc32c(bucket_name, blob_name):
+    """CRC32C of an existing object, or None if it does not exist"""
+    local_path = _local_path(bucket_name, blob_name)
+    if local_path is not None:
+        return file_crc32c(local_path) if os.path.exists(local_path) else None
+
+    blob = get_client().bucket(bucket_name).get_blob(blob_name)
+    return blob.crc32c if blob is not None else None
+
+def _state_file(bucket_name, blob_name):
+    key = hashlib.sha256(f"{bucket_name}/{blob_name}".encode()).hexdigest()
+    return os.path.join(UPLOAD_STATE_DIR, f"{key}.json")
+
+def _resumable_upload(bucket_name, local_file, blob_name, chunk_size=CHUNK_SIZE):
+    """
+    Upload a file through a resumable session, continuing an interrupted one
+
+    The session URL is stored in UPLOAD_STATE_DIR until the upload completes,
+    so a later call (also from another process) asks GCS how many bytes it
+    already has and sends only the rest. Failed requests are retried with
+    exponential backoff, asking GCS for the committed offset before resending.
+    """
+    import requests
+
+    size = os.path.getsize(local_file)
+    state_file = _state_file(bucket_name, blob_name)
+    session_url = None
+    offset = 0
+
+    def committed(response):
+        # A 308 response's Range header holds the bytes GCS has persisted
+        byte_range = response.headers.get('Range')
+        return int(byte_range.rsplit('-', 1)[1]) + 1 if byte_range else 0
+
+    def start_session():
+        blob = get_client().bucket(bucket_name).blob(blob_name)
+        url = blob.create_resumable_upload_session(size=size, checksum=None)
+        os.makedirs(UPLOAD_STATE_DIR, exist_ok=True)
+        with open(state_file, 'w') as f:
+            json.dump({'session_url': url, 'size': size, 'local_file': os.path.abspath(local_file)}, f)
+        return url
+
+    # A saved session is probed for its committed offset by the first request
+    # of the retry loop below
+    resuming = False
+    if os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+        if state.get('size') == size:
+            session_url, resuming = state['session_url'], True
+    if session_url is None:
+        session_url = start_session()
+
+    with open(local_file, 'rb') as f:
+        failures = 0
+        probe = resuming
+        while offset < size:
+            try:
+                if probe:
+                    # Ask GCS what it has before (re)sending
+                    response = requests.put(session_url, headers={'Content-Range': f'bytes */{size}'})
+                else:
+                    f.seek(offset)
+                    data = f.read(chunk_size)
+                    headers = {'Content-Range': f'bytes {offset}-{offset + len(data) - 1}/{size}'}
+                    response = requests.put(session_url, data=data, headers=headers)
+                if resuming and 400 <= response.status_code < 500:
+                    # The saved session has expired; start over in a new one
+                    session_url, resuming, probe, failures = start_session(), False, False, 0
+                    continue
+                if response.status_code not in (200, 201, 308):
+                    response.raise_for_status()
+            except requests.RequestException:
+                failures += 1
+                if failures >= CHUNK_ATTEMPTS:
+                    raise
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (failures - 1))
+                probe = True
+                continue
+            failures = 0
+            probe = False
+            offset = size if response.status_code in (200, 201) else committed(response)
+            if resuming:
+                resuming = False
+                if offset < size:
+                    print(f"Resuming upload of {local_file} at {offset / size:.0%}")
+
+    os.remove(state_file)
+
+def _resumable_copy(local_file, destination, chunk_size=CHUNK_SIZE):
+    """LOCAL_GCS_ROOT counterpart of _resumable_upload, resuming from a .partial file"""
+    partial = destination + '.partial'
+    offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+    with open(local_file, 'rb') as src, open(partial, 'ab') as dst:
+        src.seek(offset)
+        for block in iter(lambda: src.read(chunk_size), b''):
+            dst.write(block)
+    os.replace(partial, destination)
+
+def upload_file(bucket_name, local_file, blob_name, skip_unchanged=True, resumable=False):
+    """
+    Upload a file, skipping it if the object already has the same contents
+
+    Args:
+        bucket_name: Destination bucket
+        local_file: Local file to upload
+        blob_name: Destination object name
+        skip_unchanged: Skip the upload when the object's CRC32C matches
+        resumable: Send large files through a resumable session that survives
+            interruptions instead of as concurrent chunks
+
+    Returns:
+        The gs:// URI of the object
+    """
+    uri = f"gs://{bucket_name}/{blob_name}"
+
+    if skip_unchanged and get_crc32c(bucket_name, blob_name) == file_crc32c(local_file):
+        print(f"Skipping unchanged {uri}")
+        return uri
+
+    large = os.path.getsize(local_file) >= PARALLEL_TRANSFER_THRESHOLD
+    local_path = _local_path(bucket_name, blob_name)
+    if local_path is not None:
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        if resumable and large:
+            _resumable_copy(local_file, local_path)
+        else:
+            shutil.copyfile(local_file, local_path)
+    elif resumable and large:
+        _resumable_upload(bucket_name, local_file, blob_name)
+    else:
+        blob = get_client().bucket(bucket_name).blob(blob_name)
+        if large:
+            from google.cloud.storage import transfer_manager
+            transfer_manager.upload_chunks_concurrently(
+                local_file, blob,
+                chunk_size=CHUNK_SIZE,
+                max_workers=MAX_WORKERS,
+                worker_type=transfer_manager.THREAD
+            )
+        else:
+            blob.upload_from_filename(local_file)
+
+    print(f"Uploaded {local_file} to {uri}")
+    return uri
+
+def upload_files(bucket_name, files, skip_unchanged=True, max_workers=MAX_WORKERS):
+    """
+    Upload several files concurrently
+
+    Args:
+        bucket_name: Destination bucket
+        files: Mapping of local file path to destination object name
+        skip_unchanged: Skip objects whose CRC32C already matches
+        max_workers: Number of files transferred at once
+
+    Returns:
+        Mapping of local file path to gs:// URI
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            local_file: executor.submit(upload_file, bucket_name, local_file, blob_name, skip_unchanged)
+            for local_file, blob_name in files.items()
+        }
+        return {local_file: future.result() for local_file, future in futures.items()}
+
+def upload_directory(bucket_name, local_dir, prefix, skip_unchanged=True, max_workers=MAX_WORKERS):
+    """Upload every file under ``local_dir`` to ``prefix/<relative path>``"""
+    files = {}
+    for root, _, names in os.walk(local_dir):
+        for name in names:
+            local_file = os.path.join(root, name)
+            rel = os.path.relpath(local_file, local_dir).replace(os.sep, '/')
+            files[local_file] = f"{prefix.rstrip('/')}/{rel}"
+    upload_files(bucket_name, files, skip_unchanged, max_workers)
+    return f"gs://{bucket_name}/{prefix.rstrip('/')}"
+
+def upload_content_addressed(bucket_name, local_file, prefix="data"):
+    """
+    Upload a file as ``<prefix>/objects/<sha256><ext>``
+
+    Identical contents map to the same object, so a file is only sent once
+    however often (and under whatever name) it is uploaded. Large files use a
+    resumable upload.
+
+    Returns:
+        Dict with the object name, gs:// URI, sha256, crc32c and size
+    """
+    sha256, crc32c = file_digests(local_file)
+    blob_name = f"{prefix.rstrip('/')}/objects/{sha256}{os.path.splitext(local_file)[1]}"
+    uri = f"gs://{bucket_name}/{blob_name}"
+    if get_crc32c(bucket_name, blob_name) == crc32c:
+        print(f"Skipping {local_file}, already stored as {uri}")
+    else:
+        upload_file(bucket_name, local_file, blob_name, skip_unchanged=False, resumable=True)
+        if get_crc32c(bucket_name, blob_name) != crc32c:
+            raise IOError(f"{uri} does not match {local_file} after upload")
+    return {
+        'object': blob_name,
+        'uri': uri,
+        'sha256': sha256,
+        'crc32c': crc32c,
+        'size': os.path.getsize(local_file)
+    }
+
+def upload_dataset(bucket_name, local_path, prefix="data", max_workers=MAX_WORKERS):
+    """
+    Upload a data file or a directory of shards content-addressed
+
+    A single file is uploaded with upload_content_addressed and its object URI
+    returned. For a directory every file is uploaded that way (concurrently)
+    and a manifest is stored as ``<prefix>/manifests/<sha256>.json``. The
+    manifest follows the manifest.json of data_generator.py, except that each
+    shard's ``file`` is the gs:// URI of its object (the original name is kept
+    as ``source``). Shards are listed in the order of the directory's own
+    manifest.json if it has one, otherwise sorted by name. preprocess_data
+    reads such a manifest as one dataset, fetching the shards by URI.
+
+    Args:
+        bucket_name: Destination bucket
+        local_path: Data file or shard directory
+        prefix: Object name prefix
+
+    Returns:
+        gs:// URI of the data object or of the manifest
+    """
+    prefix = prefix.rstrip('/')
+    if not os.path.isdir(local_path):
+        return upload_content_addressed(bucket_name, local_path, prefix)['uri']
+
+    source_manifest = {}
+    if os.path.exists(os.path.join(local_path, 'manifest.json')):
+        with open(os.path.join(local_path, 'manifest.json')) as f:
+            source_manifest = json.load(f)
+        shards = source_manifest['shards']
+    else:
+        shards = [
+            {'file': os.path.relpath(os.path.join(root, name), local_path).replace(os.sep, '/')}
+            for root, _, names in os.walk(local_path) for name in names
+        ]
+        shards.sort(key=lambda shard: shard['file'])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        stored = list(executor.map(
+            lambda shard: upload_content_addressed(bucket_name, os.path.join(local_path, shard['file']), prefix),
+            shards
+        ))
+
+    manifest = dict(source_manifest, shards=[
+        dict(shard, source=shard['file'], file=entry['uri'],
+             sha256=entry['sha256'], crc32c=entry['crc32c'], size=entry['size'])
+        for shard, entry in zip(shards, stored)
+    ])
+    manifest_bytes = json.dumps(manifest, indent=2, sort_keys=True).encode()
+    blob_name = f"{prefix}/manifests/{hashlib.sha256(manifest_bytes).hexdigest()}.json"
+
+    local_manifest = _local_path(bucket_name, blob_name)
+    if local_manifest is not None:
+        os.makedirs(os.path.dirname(local_manifest), exist_ok=True)
+        with open(local_manifest, 'wb') as f:
+            f.write(manifest_bytes)
+    else:
+        blob = get_client().bucket(bucket_name).blob(blob_name)
+        if not blob.exists():
+            blob.upload_from_string(manifest_bytes, content_type='application/json')
+
+    uri = f"gs://{bucket_name}/{blob_name}"
+    print(f"Uploaded {len(shards)} shards of {local_path}; manifest {uri}")
+    return uri
+
+def download_file(bucket_name, blob_name, local_file):
+    """Download an object, fetching large objects as concurrent chunks"""
+    os.makedirs(os.path.dirname(local_file) or '.', exist_ok=True)
+
+    local_path = _local_path(bucket_name, blob_name)
+    if local_path is not None:
+        shutil.copyfile(local_path, local_file)
+        return local_file
+
+    blob = get_client().bucket(bucket_name).get_blob(blob_name)
+    if blob is None:
+        raise FileNotFoundError(f"gs://{bucket_name}/{blob_name} does not exist")
+
+    if blob.size >= PARALLEL_TRANSFER_THRESHOLD:
+        from google.cloud.storage import transfer_manager
+        transfer_manager.download_chunks_concurrently(
+            blob, local_file,
+            chunk_size=CHUNK_SIZE,
+            max_workers=MAX_WORKERS,
+            worker_type=transfer_manager.THREAD
+        )
+    else:
+        blob.download_to_filename(local_file)
+    return local_file
+
+def download_files(bucket_name, files, max_workers=MAX_WORKERS):
+    """Download several objects concurrently from a mapping of object name to local path"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(download_file, bucket_name, blob_name, local_file)
+            for blob_name, local_file in files.items()
+        ]
+        return [future.result() for future in futures]
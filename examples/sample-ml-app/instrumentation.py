@@ -0,0 +1,114 @@
+"""
+Per-phase performance instrumentation for the sample ML pipeline
+
+PhaseRecorder measures wall time, CPU time, peak RSS and bytes read/written for
+consecutive phases of a step and logs each phase as a structured JSON line.
+The pipeline components (shipped in the component image) write the result to
+their ``performance`` Metrics artifact; scripts such as the benchmarks use
+write_json.
+
+Peak RSS is per phase on Linux, where /proc/self/clear_refs lets us reset the
+high-water mark; elsewhere it falls back to the process-lifetime peak.
+"""
+
+import json
+import resource
+import time
+from contextlib import contextmanager
+
+def _io_counters():
+    """Bytes read and written by this process so far (rchar/wchar), or zeros if unavailable"""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+def _reset_peak_rss():
+    """Reset the VmHWM high-water mark so the next reading covers only the new phase"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def peak_rss_mb():
+    """Peak resident set size in MiB since the last reset (or process start)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class PhaseRecorder:
+    """
+    Record resource usage for consecutive phases of a pipeline step
+
+    Call start(name) at the beginning of each phase (it ends the previous one),
+    or wrap a block in ``with recorder.phase(name):``.
+    """
+
+    def __init__(self, step, log=True):
+        self.step = step
+        self.log = log
+        self.phases = {}
+        self._current = None
+
+    def start(self, phase):
+        self.stop()
+        _reset_peak_rss()
+        self._current = (phase, time.perf_counter(), time.process_time(), _io_counters())
+
+    def stop(self):
+        if self._current is None:
+            return
+        phase, wall_start, cpu_start, (read_start, written_start) = self._current
+        bytes_read, bytes_written = _io_counters()
+        self.phases[phase] = {
+            'wall_seconds': round(time.perf_counter() - wall_start, 4),
+            'cpu_seconds': round(time.process_time() - cpu_start, 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'bytes_read': bytes_read - read_start,
+            'bytes_written': bytes_written - written_start
+        }
+        self._current = None
+        if self.log:
+            print(json.dumps({'event': 'phase', 'step': self.step, 'phase': phase, **self.phases[phase]}))
+
+    @contextmanager
+    def phase(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def summary(self):
+        """Per-phase measurements plus totals across all phases"""
+        self.stop()
+        return {
+            'step': self.step,
+            'phases': self.phases,
+            'total_wall_seconds': round(sum(p['wall_seconds'] for p in self.phases.values()), 4),
+            'total_cpu_seconds': round(sum(p['cpu_seconds'] for p in self.phases.values()), 4),
+            'peak_rss_mb': max((p['peak_rss_mb'] for p in self.phases.values()), default=0.0)
+        }
+
+    def write(self, metrics_artifact):
+        """Log every phase measurement on a KFP Metrics artifact and write them to its file"""
+        self.stop()
+        for phase, values in self.phases.items():
+            for name, value in values.items():
+                metrics_artifact.log_metric(f'{phase}_{name}', value)
+        with open(metrics_artifact.path, 'w') as f:
+            json.dump({'step': self.step, 'phases': self.phases}, f)
+
+    def write_json(self, path):
+        """Write summary() to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
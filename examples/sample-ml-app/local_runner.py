@@ -0,0 +1,423 @@
+"""
+Run the sample ML pipeline locally, without a Kubeflow endpoint
+
+The component functions from components.py are executed in-process (or in a pool
+of worker processes) against a local artifact store, with a local directory
+standing in for GCS (via LOCAL_GCS_ROOT). Independent DAG branches run
+concurrently and every step's wall time and per-phase performance metrics are
+reported, which makes this the harness for benchmarking component changes.
+"""
+
+import argparse
+import inspect
+import json
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+class LocalArtifact:
+    """Minimal stand-in for a KFP artifact backed by a local path"""
+
+    def __init__(self, path):
+        self.path = path
+        self.uri = path
+        self.metadata = {}
+
+    def log_metric(self, metric, value):
+        self.metadata[metric] = value
+
+def _artifact_outputs(component_name):
+    """Names of the Output[...] artifact parameters of a pipeline component"""
+    import components
+    from kfp.dsl.types import type_annotations
+
+    func = getattr(components, component_name).python_func
+    return [
+        name for name, param in inspect.signature(func).parameters.items()
+        if type_annotations.is_artifact_wrapped_in_Output(param.annotation)
+    ]
+
+def _execute_step(component_name, kwargs):
+    """Run one component function; executed in a worker thread or process"""
+    import components
+
+    func = getattr(components, component_name).python_func
+    start = time.perf_counter()
+    result = func(**kwargs)
+    seconds = time.perf_counter() - start
+
+    if hasattr(result, '_asdict'):
+        returned = dict(result._asdict())
+    else:
+        returned = {'Output': result}
+
+    metadata = {
+        name: value.metadata for name, value in kwargs.items()
+        if isinstance(value, LocalArtifact) and value.metadata
+    }
+    return returned, metadata, seconds
+
+def sample_pipeline_steps(
+    data_file,
+    bucket_name="local-bucket",
+    algorithms=("random_forest",),
+    test_size=0.2,
+    accuracy_threshold=0.8,
+    max_latency_ms=0.0,
+    streaming_preprocess=False,
+    preprocess_chunk_size=100000,
+    imputation="median",
+    missing_indicators=True,
+    categorical_encoding="onehot",
+    train_batch_size=100000,
+    cache_uri="",
+    sweep=False,
+    search_space="",
+    sweep_candidates=16,
+    sweep_workers=-1,
+    multi_model=False,
+    checkpoint_uri="",
+    checkpoint_interval=60.0
+):
+    """
+    Describe sample_ml_pipeline as a list of local steps
+
+    Each step names its component, its parameters, the upstream artifacts it
+    consumes (``inputs``: argument -> (step, output)), upstream return values
+    it takes as parameters (``param_inputs``, same form) and an optional
+    ``when`` condition on an upstream return value. Passing several algorithms
+    fans out one train/validate/deploy branch per algorithm after a shared
+    preprocessing step, and those branches run concurrently. With ``sweep``,
+    each branch first runs sweep_hyperparameters and trains with its best
+    parameters. With ``multi_model``, a single train_models step trains all
+    the algorithms instead and only the best is validated and deployed.
+    """
+    if sweep and multi_model:
+        raise ValueError("sweep and multi_model cannot be combined")
+
+    steps = [{
+        'name': 'preprocess_data',
+        'component': 'preprocess_data',
+        'params': {
+            'input_data': LocalArtifact(os.path.abspath(data_file)),
+            'bucket_name': bucket_name,
+            'test_size': test_size,
+            'streaming': streaming_preprocess,
+            'chunk_size': preprocess_chunk_size,
+            'cache_uri': cache_uri,
+            'imputation': imputation,
+            'missing_indicators': missing_indicators,
+            'categorical_encoding': categorical_encoding
+        },
+        'inputs': {}
+    }]
+
+    if multi_model:
+        branches = [("", None)]
+    else:
+        branches = [(f"[{algorithm}]" if len(algorithms) > 1 else "", algorithm) for algorithm in algorithms]
+
+    for suffix, algorithm in branches:
+        train_step = f"train_model{suffix}"
+        validate_step = f"validate_model{suffix}"
+        sweep_step = f"sweep_hyperparameters{suffix}"
+        if multi_model:
+            train_step = 'train_models'
+            steps.append({
+                'name': train_step,
+                'component': 'train_models',
+                'params': {
+                    'bucket_name': bucket_name,
+                    'algorithms': list(algorithms),
+                    'batch_size': train_batch_size
+                },
+                'inputs': {'processed_data': ('preprocess_data', 'processed_data')}
+            })
+        elif sweep:
+            steps.append({
+                'name': sweep_step,
+                'component': 'sweep_hyperparameters',
+                'params': {
+                    'algorithm': algorithm,
+                    'search_space': search_space,
+                    'n_candidates': sweep_candidates,
+                    'n_workers': sweep_workers
+                },
+                'inputs': {'processed_data': ('preprocess_data', 'processed_data')}
+            })
+        if not multi_model:
+            steps.append({
+                'name': train_step,
+                'component': 'train_model',
+                'params': {
+                    'bucket_name': bucket_name,
+                    'algorithm': algorithm,
+                    'batch_size': train_batch_size,
+                    'cache_uri': cache_uri,
+                    'checkpoint_uri': checkpoint_uri,
+                    'checkpoint_interval': checkpoint_interval
+                },
+                'inputs': {'processed_data': ('preprocess_data', 'processed_data')},
+                'param_inputs': {'hyperparameters': (sweep_step, 'best_params')} if sweep else {}
+            })
+        steps += [
+            {
+                'name': validate_step,
+                'component': 'validate_model',
+                'params': {
+                    'accuracy_threshold': accuracy_threshold,
+                    'max_latency_ms': max_latency_ms
+                },
+                'inputs': {
+                    'model': (train_step, 'model'),
+                    'metrics': (train_step, 'metrics'),
+                    'processed_data': ('preprocess_data', 'processed_data')
+                }
+            },
+            {
+                'name': f"prepare_deployment{suffix}",
+                'component': 'prepare_deployment',
+                'params': {
+                    'bucket_name': bucket_name,
+                    'model_name': f"sample-ml-model{'-' + algorithm if suffix else ''}"
+                },
+                'inputs': {
+                    'model': (train_step, 'model'),
+                    'processed_data': ('preprocess_data', 'processed_data')
+                },
+                'when': (validate_step, 'Output', True)
+            }
+        ]
+    return steps
+
+def run_dag(steps, run_dir, max_workers=None, executor="process"):
+    """
+    Execute steps in dependency order, running independent steps concurrently
+
+    Args:
+        steps: Step descriptions, e.g. from sample_pipeline_steps
+        run_dir: Directory for this run's output artifacts
+        max_workers: Maximum number of concurrently running steps
+        executor: "process" for a process pool, "thread" for a thread pool
+
+    Returns:
+        Mapping of step name to its status, timings, returned values and artifacts
+    """
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    pending = {step['name']: step for step in steps}
+    results = {}
+    running = {}
+    run_start = time.perf_counter()
+
+    def dependencies(step):
+        deps = [upstream for upstream, _ in step['inputs'].values()]
+        deps += [upstream for upstream, _ in step.get('param_inputs', {}).values()]
+        if step.get('when'):
+            deps.append(step['when'][0])
+        return deps
+
+    with pool_class(max_workers=max_workers or os.cpu_count()) as pool:
+        while pending or running:
+            for name, step in list(pending.items()):
+                deps = dependencies(step)
+                if any(dep not in results for dep in deps):
+                    continue
+                del pending[name]
+
+                blocked = [dep for dep in deps if results[dep]['status'] != 'succeeded']
+                condition = step.get('when')
+                if blocked:
+                    results[name] = {'status': 'skipped', 'reason': f"upstream {blocked[0]} did not succeed"}
+                    continue
+                if condition and results[condition[0]]['returned'].get(condition[1]) != condition[2]:
+                    results[name] = {'status': 'skipped', 'reason': f"condition on {condition[0]} not met"}
+                    continue
+
+                kwargs = dict(step['params'])
+                for arg, (upstream, output) in step['inputs'].items():
+                    kwargs[arg] = LocalArtifact(results[upstream]['artifacts'][output])
+                for arg, (upstream, output) in step.get('param_inputs', {}).items():
+                    kwargs[arg] = results[upstream]['returned'][output]
+                artifacts = {}
+                for output in _artifact_outputs(step['component']):
+                    artifacts[output] = os.path.join(run_dir, name, output)
+                    os.makedirs(os.path.dirname(artifacts[output]), exist_ok=True)
+                    kwargs[output] = LocalArtifact(artifacts[output])
+
+                future = pool.submit(_execute_step, step['component'], kwargs)
+                running[future] = (name, artifacts, time.perf_counter() - run_start)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, artifacts, started_at = running.pop(future)
+                finished_at = time.perf_counter() - run_start
+                try:
+                    returned, metadata, seconds = future.result()
+                except Exception as e:
+                    results[name] = {
+                        'status': 'failed',
+                        'error': repr(e),
+                        'started_at': round(started_at, 3),
+                        'seconds': round(finished_at - started_at, 3)
+                    }
+                    continue
+                results[name] = {
+                    'status': 'succeeded',
+                    'started_at': round(started_at, 3),
+                    'seconds': round(seconds, 3),
+                    'returned': returned,
+                    'artifacts': artifacts,
+                    'metrics': metadata
+                }
+                performance = artifacts.get('performance')
+                if performance and os.path.exists(performance):
+                    with open(performance) as f:
+                        results[name]['phases'] = json.load(f).get('phases', {})
+
+    return results
+
+def run_local_pipeline(data_file, store_dir="local_runs", max_workers=None, executor="process", **pipeline_args):
+    """
+    Run the sample pipeline locally and write a run summary
+
+    Args:
+        data_file: Input dataset (any format preprocess_data accepts)
+        store_dir: Root of the local artifact store; GCS uploads go to store_dir/gcs
+        max_workers: Maximum number of concurrently running steps
+        executor: "process" or "thread"
+        **pipeline_args: Passed to sample_pipeline_steps
+
+    Returns:
+        The run summary, also written to <store_dir>/runs/<run id>/run_summary.json
+    """
+    run_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+    run_dir = os.path.abspath(os.path.join(store_dir, 'runs', run_id))
+    os.makedirs(run_dir, exist_ok=True)
+
+    # Components upload to <store_dir>/gcs/<bucket>/... instead of GCS
+    os.environ['LOCAL_GCS_ROOT'] = os.path.abspath(os.path.join(store_dir, 'gcs'))
+
+    start = time.perf_counter()
+    steps = run_dag(sample_pipeline_steps(data_file, **pipeline_args), run_dir, max_workers, executor)
+    summary = {
+        'run_id': run_id,
+        'data_file': data_file,
+        'executor': executor,
+        'total_seconds': round(time.perf_counter() - start, 3),
+        'steps': steps
+    }
+
+    with open(os.path.join(run_dir, 'run_summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    return summary
+
+def print_summary(summary):
+    """Print per-step status and timings"""
+    print("\n=== Local Pipeline Run ===")
+    print(f"Run ID: {summary['run_id']}")
+    print(f"{'step':<40} {'status':>10} {'start s':>8} {'wall s':>8}")
+    for name, step in summary['steps'].items():
+        started = f"{step['started_at']:.2f}" if 'started_at' in step else "-"
+        seconds = f"{step['seconds']:.2f}" if 'seconds' in step else "-"
+        print(f"{name:<40} {step['status']:>10} {started:>8} {seconds:>8}")
+        for phase, values in step.get('phases', {}).items():
+            print(f"    {phase:<36} {'':>10} {'':>8} {values['wall_seconds']:>8.2f}")
+        if step['status'] != 'succeeded':
+            print(f"    {step.get('error') or step.get('reason')}")
+    print(f"Total wall time: {summary['total_seconds']:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the sample ML pipeline locally")
+    parser.add_argument(
+        "--data-file",
+        default="sample_datasets/classification_data.csv",
+        help="Path to training data file"
+    )
+    parser.add_argument(
+        "--algorithms",
+        nargs="+",
+        default=["random_forest"],
+        help="Algorithms to train; each gets its own concurrently executed branch"
+    )
+    parser.add_argument(
+        "--multi-model",
+        action="store_true",
+        help="Train all --algorithms in one train_models step and keep the best"
+    )
+    parser.add_argument(
+        "--store-dir",
+        default="local_runs",
+        help="Local artifact store directory (also stands in for GCS)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Maximum number of concurrently running steps (default: CPU count)"
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["process", "thread"],
+        default="process",
+        help="Run steps in worker processes or threads"
+    )
+    parser.add_argument("--test-size", type=float, default=0.2, help="Test set size (0.0-1.0)")
+    parser.add_argument("--accuracy-threshold", type=float, default=0.8, help="Minimum accuracy for deployment")
+    parser.add_argument("--max-latency-ms", type=float, default=0.0, help="Maximum p95 single-row latency (0 disables)")
+    parser.add_argument("--streaming-preprocess", action="store_true", help="Out-of-core preprocessing")
+    parser.add_argument("--preprocess-chunk-size", type=int, default=100000, help="Rows per preprocessing chunk")
+    parser.add_argument("--imputation", choices=["median", "mean", "drop"], default="median",
+                        help="Fill missing values (or drop rows with any)")
+    parser.add_argument("--no-missing-indicators", action="store_true", help="Do not add <column>_missing features")
+    parser.add_argument("--categorical-encoding", choices=["onehot", "ordinal"], default="onehot",
+                        help="Encode non-numeric columns")
+    parser.add_argument("--train-batch-size", type=int, default=100000, help="Rows per training batch")
+    parser.add_argument("--cache-uri", default="", help="Step cache directory")
+    parser.add_argument("--checkpoint-uri", default="", help="Directory for train_model checkpoints (resumes a killed run)")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0, help="Seconds between train_model checkpoints")
+    parser.add_argument("--sweep", action="store_true", help="Run a hyperparameter sweep before training")
+    parser.add_argument("--search-space", help="JSON file with the sweep search space")
+    parser.add_argument("--sweep-candidates", type=int, default=16, help="Candidates sampled from the search space")
+    parser.add_argument("--sweep-workers", type=int, default=-1, help="Sweep worker processes (-1: all CPUs)")
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data_file):
+        print(f"Data file {args.data_file} not found.")
+        print("Run data_generator.py first to create sample data:")
+        print("python data_generator.py")
+        return
+
+    from run_pipeline import load_search_space
+
+    summary = run_local_pipeline(
+        data_file=args.data_file,
+        store_dir=args.store_dir,
+        max_workers=args.workers,
+        executor=args.executor,
+        algorithms=args.algorithms,
+        test_size=args.test_size,
+        accuracy_threshold=args.accuracy_threshold,
+        max_latency_ms=args.max_latency_ms,
+        streaming_preprocess=args.streaming_preprocess,
+        preprocess_chunk_size=args.preprocess_chunk_size,
+        imputation=args.imputation,
+        missing_indicators=not args.no_missing_indicators,
+        categorical_encoding=args.categorical_encoding,
+        train_batch_size=args.train_batch_size,
+        cache_uri=args.cache_uri,
+        sweep=args.sweep or bool(args.search_space),
+        search_space=load_search_space(args.search_space),
+        sweep_candidates=args.sweep_candidates,
+        sweep_workers=args.sweep_workers,
+        multi_model=args.multi_model,
+        checkpoint_uri=args.checkpoint_uri,
+        checkpoint_interval=args.checkpoint_interval
+    )
+    print_summary(summary)
+
+if __name__ == "__main__":
+    main()
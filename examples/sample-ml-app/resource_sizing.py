@@ -0,0 +1,213 @@
+"""
+Profile-driven resource right-sizing for the sample ML pipeline
+
+Each component writes per-phase peak RSS and CPU time to its `performance`
+Metrics output. Recording those measurements together with the input dataset
+size builds a profile store (a JSON file). From it, recommend_resources fits a
+linear memory model per step (and per algorithm for training) and returns CPU
+and memory requests/limits for a new input size. build_pipeline in pipeline.py
+applies them at compile time.
+
+Steps without enough recorded profiles keep the DEFAULT_RESOURCES values.
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+
+# Hand-tuned defaults, used when there is no profile data for a step
+DEFAULT_RESOURCES = {
+    'preprocess_data': {
+        'cpu_request': '500m',
+        'cpu_limit': '1000m',
+        'memory_request': '1Gi',
+        'memory_limit': '2Gi'
+    },
+    'train_model': {
+        'cpu_request': '1000m',
+        'cpu_limit': '2000m',
+        'memory_request': '2Gi',
+        'memory_limit': '4Gi'
+    },
+    'train_models': {
+        'cpu_request': '2000m',
+        'cpu_limit': '4000m',
+        'memory_request': '3Gi',
+        'memory_limit': '6Gi'
+    },
+    'sweep_hyperparameters': {
+        'cpu_request': '2000m',
+        'cpu_limit': '4000m',
+        'memory_request': '2Gi',
+        'memory_limit': '4Gi'
+    },
+    'validate_model': {
+        'cpu_request': '200m',
+        'cpu_limit': '500m',
+        'memory_request': '512Mi',
+        'memory_limit': '1Gi'
+    },
+    'prepare_deployment': {
+        'cpu_request': '200m',
+        'cpu_limit': '500m',
+        'memory_request': '512Mi',
+        'memory_limit': '1Gi'
+    }
+}
+
+# Steps whose resource usage depends on the training algorithm
+ALGORITHM_DEPENDENT_STEPS = {'train_model', 'sweep_hyperparameters', 'validate_model', 'prepare_deployment'}
+
+MIN_MEMORY_MB = 256
+MIN_CPU_MILLICORES = 100
+
+def load_profiles(store_path):
+    """Load recorded profiles from a JSON store, or an empty list if it does not exist"""
+    if not store_path or not os.path.exists(store_path):
+        return []
+    with open(store_path) as f:
+        return json.load(f).get('profiles', [])
+
+def record_profile(store_path, performance, input_bytes, algorithm="random_forest"):
+    """
+    Add one step's measurements to the profile store
+
+    Args:
+        store_path: JSON profile store (created if missing)
+        performance: Contents of a component's `performance` artifact
+            ({'step': ..., 'phases': {...}})
+        input_bytes: Size of the input dataset the run was given
+        algorithm: Training algorithm of the run
+
+    Returns:
+        The recorded profile
+    """
+    phases = performance['phases'].values()
+    profile = {
+        'step': performance['step'],
+        'algorithm': algorithm,
+        'input_bytes': int(input_bytes),
+        'peak_rss_mb': max((p['peak_rss_mb'] for p in phases), default=0.0),
+        'cpu_seconds': sum(p['cpu_seconds'] for p in phases),
+        'wall_seconds': sum(p['wall_seconds'] for p in phases),
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+
+    profiles = load_profiles(store_path) + [profile]
+    with open(store_path, 'w') as f:
+        json.dump({'profiles': profiles}, f, indent=2)
+    return profile
+
+def _fit_line(points):
+    """Least-squares fit of y = a + b*x, with the slope clamped to be non-negative"""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return mean_y, 0.0
+    slope = max(0.0, sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x)
+    return mean_y - slope * mean_x, slope
+
+def _format_memory(mb):
+    """Format MiB as a Kubernetes quantity, rounded up to a multiple of 64Mi"""
+    mb = max(MIN_MEMORY_MB, int(math.ceil(mb / 64.0)) * 64)
+    if mb % 1024 == 0:
+        return f"{mb // 1024}Gi"
+    return f"{mb}Mi"
+
+def _format_cpu(cores):
+    """Format cores as Kubernetes millicores, rounded up to a multiple of 100m"""
+    return f"{max(MIN_CPU_MILLICORES, int(math.ceil(cores * 10)) * 100)}m"
+
+def estimate_step(profiles, step, input_bytes, algorithm="random_forest",
+                  memory_headroom=1.25, min_profiles=2):
+    """
+    Estimate requests/limits for one step, or None if there are too few profiles
+
+    Peak memory is predicted from a linear fit over input size; the request adds
+    ``memory_headroom`` and the limit another 50% on top. The CPU request is the
+    mean number of cores the step kept busy (CPU time / wall time), and the limit
+    is twice that.
+    """
+    matching = [
+        p for p in profiles
+        if p['step'] == step and (step not in ALGORITHM_DEPENDENT_STEPS or p['algorithm'] == algorithm)
+    ]
+    if len(matching) < min_profiles:
+        return None
+
+    intercept, slope = _fit_line([(p['input_bytes'], p['peak_rss_mb']) for p in matching])
+    # Never predict below the largest peak observed for a smaller or equal input
+    observed = [p['peak_rss_mb'] for p in matching if p['input_bytes'] <= input_bytes]
+    peak_mb = max([intercept + slope * input_bytes] + observed)
+
+    busy_cores = [
+        p['cpu_seconds'] / p['wall_seconds'] for p in matching if p['wall_seconds'] > 0
+    ]
+    cores = sum(busy_cores) / len(busy_cores) if busy_cores else 1.0
+
+    memory_request_mb = peak_mb * memory_headroom
+    return {
+        'cpu_request': _format_cpu(cores),
+        'cpu_limit': _format_cpu(cores * 2),
+        'memory_request': _format_memory(memory_request_mb),
+        'memory_limit': _format_memory(memory_request_mb * 1.5)
+    }
+
+def recommend_resources(input_bytes, algorithm="random_forest", store_path=None, memory_headroom=1.25):
+    """
+    Recommend CPU/memory requests and limits for every pipeline step
+
+    Args:
+        input_bytes: Size of the input dataset
+        algorithm: Training algorithm the pipeline will run
+        store_path: JSON profile store written by record_profile
+        memory_headroom: Multiplier applied to the predicted peak memory
+
+    Returns:
+        Mapping of step name to {'cpu_request', 'cpu_limit', 'memory_request', 'memory_limit'}
+    """
+    profiles = load_profiles(store_path)
+    resources = {}
+    for step, defaults in DEFAULT_RESOURCES.items():
+        estimate = estimate_step(profiles, step, input_bytes, algorithm, memory_headroom)
+        resources[step] = estimate or dict(defaults)
+    return resources
+
+def main():
+    parser = argparse.ArgumentParser(description="Right-size pipeline resources from recorded profiles")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    recommend = subparsers.add_parser("recommend", help="Print recommended resources")
+    recommend.add_argument("--data-file", required=True, help="Input data file or shard directory the pipeline will run on")
+    recommend.add_argument("--algorithm", default="random_forest", help="Training algorithm")
+    recommend.add_argument("--profile-store", default="resource_profiles.json", help="JSON profile store")
+
+    record = subparsers.add_parser("record", help="Record a step's performance artifact")
+    record.add_argument("performance_file", help="JSON file from a component's performance output")
+    record.add_argument("--input-bytes", type=int, required=True, help="Size of the run's input dataset")
+    record.add_argument("--algorithm", default="random_forest", help="Training algorithm of the run")
+    record.add_argument("--profile-store", default="resource_profiles.json", help="JSON profile store")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        with open(args.performance_file) as f:
+            profile = record_profile(args.profile_store, json.load(f), args.input_bytes, args.algorithm)
+        print(f"Recorded {profile['step']} profile: {profile['peak_rss_mb']} MiB peak, "
+              f"{profile['cpu_seconds']:.1f} CPU seconds")
+        return
+
+    # Sized like run_pipeline does, so shard directories count all their files
+    from run_pipeline import dataset_bytes
+
+    resources = recommend_resources(
+        dataset_bytes(args.data_file), args.algorithm, args.profile_store
+    )
+    print(json.dumps(resources, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,60 @@
 """
 Script to run the sample ML pipeline on Kubeflow
+
+Besides single runs, a batch mode (``--batch spec.json``) expands a matrix of
+parameter sets and data files into many runs, uploads the data concurrently,
+keeps at most ``--max-concurrent`` runs in flight, polls each run with
+exponential backoff and writes a summary of outcomes and durations.
 """
 
-import kfp
-from kfp.client import Client
 import argparse
+import hashlib
+import inspect
+import itertools
+import json
 import os
-import yaml
-from google.cloud import storage
-
-def upload_data_to_gcs(bucket_name, local_file, gcs_path):
-    """Upload data file to Google Cloud Storage"""
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(gcs_path)
-    blob.upload_from_filename(local_file)
-    print(f"Uploaded {local_file} to gs://{bucket_name}/{gcs_path}")
-    return f"gs://{bucket_name}/{gcs_path}"
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import gcs_transfer
+
+# kfp is imported where it is used, so --help and argument errors return
+# without paying its import time
+
+# Modules whose source determines the compiled pipeline
+PIPELINE_SOURCES = ["pipeline.py", "components.py", "resource_sizing.py"]
+DEFAULT_COMPILE_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "sample-ml-app", "pipelines")
+
+# KFP run states after which a run no longer changes
+TERMINAL_STATES = {'SUCCEEDED', 'FAILED', 'SKIPPED', 'CANCELED', 'ERROR'}
+
+def upload_data_to_gcs(bucket_name, local_path, prefix="data"):
+    """
+    Upload a data file or shard directory to Google Cloud Storage, content-addressed
+
+    Files are stored once under ``<prefix>/objects/`` by their SHA-256 and
+    skipped if already there; a shard directory also gets a manifest. The
+    returned URI never changes for the same data, which keeps the step cache
+    reliable. Large files are uploaded resumably.
+
+    Returns:
+        gs:// URI of the data object or of the shard manifest
+    """
+    return gcs_transfer.upload_dataset(bucket_name, local_path, prefix)
+
+def dataset_bytes(path):
+    """Size of a data file, or the total size of the files in a shard directory"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def load_search_space(path):
+    """Read a sweep search space file and return it as a compact JSON string ("" if no file)"""
+    if not path:
+        return ""
+    with open(path) as f:
+        return json.dumps(json.load(f))
 
 def create_experiment(client, experiment_name, experiment_description):
     """Create or get experiment"""
@@ -31,6 +69,130 @@ def create_experiment(client, experiment_name, experiment_description):
         print(f"Created new experiment: {experiment_name}")
     return experiment
 
+def pipeline_arguments(
+    bucket_name,
+    input_data_path,
+    algorithm="random_forest",
+    test_size=0.2,
+    accuracy_threshold=0.8,
+    streaming_preprocess=False,
+    preprocess_chunk_size=100000,
+    imputation="median",
+    missing_indicators=True,
+    categorical_encoding="onehot",
+    train_batch_size=100000,
+    cache_uri="",
+    max_latency_ms=0.0,
+    search_space="",
+    sweep_candidates=16,
+    algorithms=None,
+    checkpoint_uri="",
+    checkpoint_interval=60.0
+):
+    """Pipeline parameters for one run (``algorithms`` only for the multi-model variant)"""
+    arguments = {
+        'bucket_name': bucket_name,
+        'input_data_path': input_data_path,
+        'algorithm': algorithm,
+        'test_size': test_size,
+        'accuracy_threshold': accuracy_threshold,
+        'streaming_preprocess': streaming_preprocess,
+        'preprocess_chunk_size': preprocess_chunk_size,
+        'imputation': imputation,
+        'missing_indicators': missing_indicators,
+        'categorical_encoding': categorical_encoding,
+        'train_batch_size': train_batch_size,
+        'cache_uri': cache_uri,
+        'max_latency_ms': max_latency_ms,
+        'search_space': search_space,
+        'sweep_candidates': sweep_candidates,
+        'checkpoint_uri': checkpoint_uri,
+        'checkpoint_interval': checkpoint_interval
+    }
+    if algorithms:
+        arguments['algorithms'] = list(algorithms)
+    return arguments
+
+# Options a batch run may set: the pipeline parameters, plus sweep to pick the variant
+BATCH_OPTIONS = (set(inspect.signature(pipeline_arguments).parameters) - {'bucket_name', 'input_data_path'}) | {'sweep'}
+
+def _package_version(name):
+    from importlib import metadata
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+def pipeline_cache_key(sweep=False, resources=None, multi_model=False):
+    """
+    Digest of everything a compiled pipeline package depends on
+
+    Covers the source of the pipeline modules, the installed kfp and
+    kfp-kubernetes versions, the pipeline variant, the component image
+    (COMPONENT_IMAGE) and any per-step resources. Nothing is imported, so
+    the key is cheap to compute.
+    """
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in PIPELINE_SOURCES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(name.encode())
+            digest.update(f.read())
+    digest.update(json.dumps({
+        'kfp': _package_version('kfp'),
+        'kfp-kubernetes': _package_version('kfp-kubernetes'),
+        'sweep': sweep,
+        'multi_model': multi_model,
+        'component_image': os.environ.get('COMPONENT_IMAGE'),
+        'resources': resources
+    }, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+def compile_pipeline(sweep=False, resources=None, cache_dir=None, multi_model=False):
+    """
+    Return the pipeline package to submit, compiling it only if it changed
+
+    Compiled packages are cached as ``<cache_dir>/<variant>-<key>.yaml``, where
+    the key is pipeline_cache_key, so edits to the pipeline or a kfp upgrade
+    trigger a recompile and everything else reuses the cached package.
+
+    Args:
+        sweep: Use the pipeline variant with a hyperparameter sweep step
+        resources: Optional per-step resources from resource_sizing
+        cache_dir: Cache directory (default: PIPELINE_COMPILE_CACHE or
+            ~/.cache/sample-ml-app/pipelines)
+        multi_model: Use the pipeline variant training several algorithms in one step
+    """
+    cache_dir = cache_dir or os.environ.get("PIPELINE_COMPILE_CACHE", DEFAULT_COMPILE_CACHE)
+    if multi_model:
+        variant = "sample_ml_multi_model_pipeline"
+    elif sweep:
+        variant = "sample_ml_sweep_pipeline"
+    else:
+        variant = "sample_ml_pipeline"
+    if resources:
+        variant += ".sized"
+    key = pipeline_cache_key(sweep, resources, multi_model)
+    pipeline_file = os.path.join(cache_dir, f"{variant}-{key}.yaml")
+    if os.path.exists(pipeline_file):
+        print(f"Using compiled pipeline {pipeline_file}")
+        return pipeline_file
+    
+    print(f"Compiling {variant} to {pipeline_file}...")
+    from pipeline import build_pipeline
+    from kfp.compiler import Compiler
+    
+    # Compile to a temporary name and rename, so concurrent callers never see a partial file
+    os.makedirs(cache_dir, exist_ok=True)
+    partial_file = os.path.join(cache_dir, f".{variant}-{os.getpid()}-{threading.get_ident()}.yaml")
+    Compiler().compile(
+        pipeline_func=build_pipeline(resources, sweep=sweep, multi_model=multi_model),
+        package_path=partial_file
+    )
+    os.replace(partial_file, pipeline_file)
+    print("Pipeline compiled successfully!")
+    return pipeline_file
+
 def run_pipeline(
     kubeflow_endpoint,
     bucket_name,
@@ -39,9 +201,25 @@ def run_pipeline(
     pipeline_name="sample-ml-pipeline-run",
     algorithm="random_forest",
     test_size=0.2,
-    accuracy_threshold=0.8
+    accuracy_threshold=0.8,
+    streaming_preprocess=False,
+    preprocess_chunk_size=100000,
+    imputation="median",
+    missing_indicators=True,
+    categorical_encoding="onehot",
+    train_batch_size=100000,
+    cache_uri="",
+    profile_store=None,
+    max_latency_ms=0.0,
+    sweep=False,
+    search_space="",
+    sweep_candidates=16,
+    algorithms=None,
+    checkpoint_uri="",
+    checkpoint_interval=60.0
 ):
-    """Run the ML pipeline on Kubeflow"""
+    """Run the ML pipeline on Kubeflow (training every algorithm in ``algorithms`` if given)"""
+    from kfp.client import Client
     
     # Initialize Kubeflow client
     client = Client(host=kubeflow_endpoint)
@@ -54,46 +232,284 @@ def run_pipeline(
     )
     
     # Upload data to GCS
-    gcs_data_path = upload_data_to_gcs(
-        bucket_name=bucket_name,
-        local_file=data_file,
-        gcs_path=f"data/{os.path.basename(data_file)}"
-    )
+    gcs_data_path = upload_data_to_gcs(bucket_name=bucket_name, local_path=data_file)
     
     # Load and compile pipeline
-    pipeline_file = "sample_ml_pipeline.yaml"
-    if not os.path.exists(pipeline_file):
-        print(f"Pipeline file {pipeline_file} not found. Compiling...")
-        # Import and compile the pipeline
-        from pipeline import sample_ml_pipeline
-        from kfp.compiler import Compiler
+    resources = None
+    if profile_store:
+        # Right-size each step for this input from previously recorded profiles
+        from resource_sizing import recommend_resources
         
-        compiler = Compiler()
-        compiler.compile(
-            pipeline_func=sample_ml_pipeline,
-            package_path=pipeline_file
-        )
-        print("Pipeline compiled successfully!")
+        resources = recommend_resources(dataset_bytes(data_file), algorithm, profile_store)
+        for step, step_resources in resources.items():
+            print(f"{step}: {step_resources}")
+    pipeline_file = compile_pipeline(sweep, resources, multi_model=bool(algorithms))
     
     # Run the pipeline
     run_result = client.run_pipeline(
-        experiment_id=experiment.id,
+        experiment_id=experiment.experiment_id,
         job_name=pipeline_name,
         pipeline_package_path=pipeline_file,
-        params={
-            'bucket_name': bucket_name,
-            'input_data_path': gcs_data_path,
-            'algorithm': algorithm,
-            'test_size': test_size,
-            'accuracy_threshold': accuracy_threshold
-        }
+        params=pipeline_arguments(
+            bucket_name,
+            gcs_data_path,
+            algorithm=algorithm,
+            test_size=test_size,
+            accuracy_threshold=accuracy_threshold,
+            streaming_preprocess=streaming_preprocess,
+            preprocess_chunk_size=preprocess_chunk_size,
+            imputation=imputation,
+            missing_indicators=missing_indicators,
+            categorical_encoding=categorical_encoding,
+            train_batch_size=train_batch_size,
+            cache_uri=cache_uri,
+            max_latency_ms=max_latency_ms,
+            search_space=search_space,
+            sweep_candidates=sweep_candidates,
+            algorithms=algorithms,
+            checkpoint_uri=checkpoint_uri,
+            checkpoint_interval=checkpoint_interval
+        )
     )
     
-    print(f"Pipeline run started: {run_result.id}")
-    print(f"You can monitor the run at: {kubeflow_endpoint}/_/pipeline/#/runs/details/{run_result.id}")
+    print(f"Pipeline run started: {run_result.run_id}")
+    print(f"You can monitor the run at: {kubeflow_endpoint}/_/pipeline/#/runs/details/{run_result.run_id}")
     
     return run_result
 
+def expand_batch(spec, default_data_file=None):
+    """
+    Expand a batch spec into a list of runs
+
+    A spec is a dict with optional keys:
+        base: options shared by every run (any of BATCH_OPTIONS, e.g.
+            algorithm, test_size, sweep, search_space, or algorithms for the
+            multi-model variant); search_space is a search space file or an
+            inline JSON object
+        matrix: option name -> list of values; one run per combination
+        data_files: data files; every combination runs on each of them
+        runs: explicit option dicts (may include data_file and name), run in
+            addition to the matrix
+        name_prefix: prefix of generated run names (default "batch")
+
+    Returns:
+        List of {'name', 'data_file', 'options'} dicts
+
+    Raises:
+        ValueError: If a run has no data file, sets an option not in BATCH_OPTIONS
+            or combines algorithms with sweep or search_space
+    """
+    base = dict(spec.get('base', {}))
+    matrix = spec.get('matrix', {})
+    data_files = spec.get('data_files') or [base.pop('data_file', default_data_file)]
+    prefix = spec.get('name_prefix', 'batch')
+    
+    runs = []
+    names = list(matrix)
+    combinations = list(itertools.product(*(matrix[name] for name in names))) if names else [()]
+    if matrix or not spec.get('runs'):
+        for data_file in data_files:
+            for values in combinations:
+                runs.append({'data_file': data_file, 'options': dict(base, **dict(zip(names, values)))})
+    for explicit in spec.get('runs', []):
+        options = dict(base, **explicit)
+        runs.append({
+            'data_file': options.pop('data_file', data_files[0]),
+            'name': options.pop('name', None),
+            'options': options
+        })
+    
+    for i, run in enumerate(runs):
+        options = run['options']
+        if not run.get('name'):
+            # Multi-model runs are named after every algorithm they train
+            trained = options.get('algorithms') or [options.get('algorithm', 'random_forest')]
+            run['name'] = f"{prefix}-{i:03d}-{'-'.join(trained)}"
+        if not run['data_file']:
+            raise ValueError(f"Run {run['name']} has no data file")
+        unsupported = sorted(set(options) - BATCH_OPTIONS)
+        if unsupported:
+            raise ValueError(f"Run {run['name']} sets unsupported options {', '.join(unsupported)}; "
+                             f"use {', '.join(sorted(BATCH_OPTIONS))}")
+        if options.get('algorithms') and (options.get('sweep') or options.get('search_space')):
+            raise ValueError(f"Run {run['name']}: sweep and multi_model cannot be combined "
+                             f"(algorithms is set together with sweep or search_space)")
+        search_space = options.get('search_space')
+        if isinstance(search_space, dict):
+            options['search_space'] = json.dumps(search_space)
+        elif search_space:
+            options['search_space'] = load_search_space(search_space)
+    return runs
+
+def wait_for_run(client, run_id, poll_interval=10.0, max_poll_interval=300.0, backoff=2.0,
+                 timeout=None, on_state=None):
+    """
+    Poll a run until it reaches a terminal state
+
+    The interval between polls starts at ``poll_interval`` and grows by
+    ``backoff`` up to ``max_poll_interval``. Errors from ``get_run`` are
+    retried with the same backoff; five in a row are raised.
+
+    Args:
+        client: KFP client (anything with ``get_run(run_id)`` returning an
+            object with ``state`` and ``error``)
+        run_id: Run to wait for
+        timeout: Give up after this many seconds (state "TIMEOUT")
+        on_state: Called with each new state
+
+    Returns:
+        Tuple of (state, error message or None)
+    """
+    start = time.monotonic()
+    interval = poll_interval
+    state = None
+    failures = 0
+    while True:
+        try:
+            run = client.get_run(run_id)
+            failures = 0
+        except Exception:
+            failures += 1
+            if failures >= 5:
+                raise
+            run = None
+        if run is not None:
+            new_state = str(run.state or 'PENDING').upper()
+            if new_state != state:
+                state = new_state
+                if on_state is not None:
+                    on_state(state)
+            if state in TERMINAL_STATES:
+                error = getattr(run, 'error', None)
+                return state, (getattr(error, 'message', None) or str(error)) if error else None
+        if timeout is not None and time.monotonic() - start >= timeout:
+            return 'TIMEOUT', f"No terminal state after {timeout:.0f}s (last state {state})"
+        time.sleep(interval)
+        interval = min(interval * backoff, max_poll_interval)
+
+def run_batch(
+    client,
+    bucket_name,
+    runs,
+    experiment_name="sample-ml-experiment",
+    max_concurrent=4,
+    poll_interval=10.0,
+    max_poll_interval=300.0,
+    timeout=None,
+    summary_file=None
+):
+    """
+    Submit a batch of runs and wait for all of them
+
+    Data files are uploaded concurrently first and every pipeline variant is
+    compiled once. Then at most ``max_concurrent`` runs are in flight at a
+    time: each worker submits a run and polls it to completion before taking
+    the next one.
+
+    Args:
+        client: KFP client, or a stub with get_experiment, create_experiment,
+            run_pipeline and get_run
+        bucket_name: GCS bucket for the input data
+        runs: Runs from expand_batch
+        experiment_name: Experiment all runs are created in
+        max_concurrent: Maximum number of runs in flight
+        poll_interval: Initial seconds between status polls of a run
+        max_poll_interval: Upper bound of the poll backoff
+        timeout: Per-run timeout in seconds (None waits indefinitely)
+        summary_file: Optional path to write the JSON summary to
+
+    Returns:
+        Summary dict with per-run results and counts by state
+    """
+    batch_start = time.perf_counter()
+    experiment = create_experiment(
+        client=client,
+        experiment_name=experiment_name,
+        experiment_description="Sample ML pipeline for cost-effective Kubeflow on GKE"
+    )
+    
+    data_files = sorted({run['data_file'] for run in runs})
+    with ThreadPoolExecutor(max_workers=gcs_transfer.MAX_WORKERS) as executor:
+        data_uris = dict(zip(data_files, executor.map(
+            lambda data_file: upload_data_to_gcs(bucket_name, data_file), data_files
+        )))
+    def variant(options):
+        return (bool(options.get('sweep') or options.get('search_space')), bool(options.get('algorithms')))
+    
+    pipeline_files = {
+        (sweep, multi_model): compile_pipeline(sweep, multi_model=multi_model)
+        for sweep, multi_model in sorted({variant(run['options']) for run in runs})
+    }
+    
+    print_lock = threading.Lock()
+    
+    def log(message):
+        with print_lock:
+            print(message, flush=True)
+    
+    def execute(run):
+        options = dict(run['options'])
+        pipeline_file = pipeline_files[variant(options)]
+        options.pop('sweep', None)
+        result = {
+            'name': run['name'],
+            'data_file': run['data_file'],
+            'options': run['options'],
+            'run_id': None,
+            'state': None,
+            'error': None
+        }
+        start = time.perf_counter()
+        try:
+            submitted = client.run_pipeline(
+                experiment_id=experiment.experiment_id,
+                job_name=run['name'],
+                pipeline_package_path=pipeline_file,
+                params=pipeline_arguments(bucket_name, data_uris[run['data_file']], **options)
+            )
+            result['run_id'] = submitted.run_id
+            result['submitted_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            log(f"[{run['name']}] submitted as {submitted.run_id}")
+            result['state'], result['error'] = wait_for_run(
+                client, submitted.run_id, poll_interval, max_poll_interval, timeout=timeout,
+                on_state=lambda state: log(f"[{run['name']}] {state}")
+            )
+        except Exception as e:
+            result['state'] = 'SUBMIT_FAILED' if result['run_id'] is None else 'UNKNOWN'
+            result['error'] = str(e)
+            log(f"[{run['name']}] {result['state']}: {e}")
+        result['duration_seconds'] = round(time.perf_counter() - start, 1)
+        return result
+    
+    with ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+        results = list(executor.map(execute, runs))
+    
+    counts = {}
+    for result in results:
+        counts[result['state']] = counts.get(result['state'], 0) + 1
+    summary = {
+        'experiment': experiment_name,
+        'total_seconds': round(time.perf_counter() - batch_start, 1),
+        'counts': counts,
+        'runs': results
+    }
+    if summary_file:
+        with open(summary_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+def print_batch_summary(summary):
+    """Print the outcome and duration of every run in a batch"""
+    print("\n=== Batch Run Summary ===")
+    print(f"{'run':<40} {'state':<14} {'minutes':>8}  run id")
+    for result in summary['runs']:
+        print(f"{result['name']:<40} {result['state']:<14} {result['duration_seconds'] / 60:>8.1f}  "
+              f"{result['run_id'] or '-'}")
+        if result['error']:
+            print(f"    {result['error']}")
+    counts = ", ".join(f"{count} {state.lower()}" for state, count in sorted(summary['counts'].items()))
+    print(f"{len(summary['runs'])} runs in {summary['total_seconds'] / 60:.1f} minutes: {counts}")
+
 def main():
     parser = argparse.ArgumentParser(description="Run sample ML pipeline on Kubeflow")
     parser.add_argument(
@@ -109,7 +525,7 @@ def main():
     parser.add_argument(
         "--data-file",
         default="sample_datasets/classification_data.csv",
-        help="Path to training data file"
+        help="Path to training data file, or a directory of shards"
     )
     parser.add_argument(
         "--experiment-name",
@@ -123,10 +539,16 @@ def main():
     )
     parser.add_argument(
         "--algorithm",
-        choices=["random_forest", "logistic_regression"],
+        choices=["random_forest", "logistic_regression", "sgd"],
         default="random_forest",
         help="ML algorithm to use"
     )
+    parser.add_argument(
+        "--algorithms",
+        nargs="+",
+        choices=["random_forest", "logistic_regression", "sgd"],
+        help="Train all of these concurrently in one step and deploy the best (replaces --algorithm)"
+    )
     parser.add_argument(
         "--test-size",
         type=float,
@@ -139,8 +561,148 @@ def main():
         default=0.8,
         help="Minimum accuracy threshold for deployment"
     )
+    parser.add_argument(
+        "--max-latency-ms",
+        type=float,
+        default=0.0,
+        help="Maximum p95 single-row predict latency for deployment (0 disables the check)"
+    )
+    parser.add_argument(
+        "--streaming-preprocess",
+        action="store_true",
+        help="Preprocess the input out-of-core in chunks (constant memory)"
+    )
+    parser.add_argument(
+        "--preprocess-chunk-size",
+        type=int,
+        default=100000,
+        help="Rows per chunk when --streaming-preprocess is set"
+    )
+    parser.add_argument(
+        "--imputation",
+        choices=["median", "mean", "drop"],
+        default="median",
+        help="How to fill missing values (drop removes rows with any missing value)"
+    )
+    parser.add_argument(
+        "--no-missing-indicators",
+        action="store_true",
+        help="Do not add a <column>_missing feature for columns with missing values"
+    )
+    parser.add_argument(
+        "--categorical-encoding",
+        choices=["onehot", "ordinal"],
+        default="onehot",
+        help="How to encode non-numeric columns"
+    )
+    parser.add_argument(
+        "--train-batch-size",
+        type=int,
+        default=100000,
+        help="Rows per partial_fit batch for the sgd algorithm (also the evaluation batch size)"
+    )
+    parser.add_argument(
+        "--cache-uri",
+        default="",
+        help="Step cache location (e.g., gs://your-bucket/step-cache); unchanged steps are skipped"
+    )
+    parser.add_argument(
+        "--checkpoint-uri",
+        default="",
+        help="Checkpoint location for train_model (e.g., gs://your-bucket/checkpoints); a preempted fit resumes"
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between train_model checkpoints"
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Run a successive-halving hyperparameter sweep before training"
+    )
+    parser.add_argument(
+        "--search-space",
+        help="JSON file with the sweep search space (value lists or a Katib-style parameters spec)"
+    )
+    parser.add_argument(
+        "--sweep-candidates",
+        type=int,
+        default=16,
+        help="Number of candidates sampled from the search space"
+    )
+    parser.add_argument(
+        "--profile-store",
+        help="JSON store of recorded step profiles; sizes each step's CPU/memory for this input"
+    )
+    parser.add_argument(
+        "--batch",
+        help="JSON batch spec (base options, parameter matrix, data files); submits every run and waits for them"
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=4,
+        help="Batch mode: maximum number of runs in flight"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=10.0,
+        help="Batch mode: initial seconds between status polls (doubles up to --max-poll-interval)"
+    )
+    parser.add_argument(
+        "--max-poll-interval",
+        type=float,
+        default=300.0,
+        help="Batch mode: maximum seconds between status polls"
+    )
+    parser.add_argument(
+        "--run-timeout",
+        type=float,
+        help="Batch mode: stop waiting for a run after this many seconds"
+    )
+    parser.add_argument(
+        "--summary-file",
+        default="batch_summary.json",
+        help="Batch mode: where to write the JSON summary"
+    )
     
     args = parser.parse_args()
+    if args.algorithms and (args.sweep or args.search_space):
+        parser.error("--algorithms cannot be combined with --sweep")
+    
+    if args.batch:
+        with open(args.batch) as f:
+            spec = json.load(f)
+        try:
+            runs = expand_batch(spec, args.data_file)
+        except (ValueError, OSError) as e:
+            print(f"Invalid batch spec {args.batch}: {e}")
+            sys.exit(1)
+        missing = sorted({run['data_file'] for run in runs if not os.path.exists(run['data_file'])})
+        if missing:
+            print(f"Data files not found: {', '.join(missing)}")
+            sys.exit(1)
+        
+        from kfp.client import Client
+        summary = run_batch(
+            Client(host=args.kubeflow_endpoint),
+            args.bucket_name,
+            runs,
+            experiment_name=spec.get('experiment_name', args.experiment_name),
+            max_concurrent=args.max_concurrent,
+            poll_interval=args.poll_interval,
+            max_poll_interval=args.max_poll_interval,
+            timeout=args.run_timeout,
+            summary_file=args.summary_file
+        )
+        print_batch_summary(summary)
+        print(f"Summary saved to {args.summary_file}")
+        if set(summary['counts']) - {'SUCCEEDED'}:
+            sys.exit(1)
+        return
     
     # Check if data file exists
     if not os.path.exists(args.data_file):
@@ -159,17 +721,34 @@ def main():
             pipeline_name=args.pipeline_name,
             algorithm=args.algorithm,
             test_size=args.test_size,
-            accuracy_threshold=args.accuracy_threshold
+            accuracy_threshold=args.accuracy_threshold,
+            streaming_preprocess=args.streaming_preprocess,
+            preprocess_chunk_size=args.preprocess_chunk_size,
+            imputation=args.imputation,
+            missing_indicators=not args.no_missing_indicators,
+            categorical_encoding=args.categorical_encoding,
+            train_batch_size=args.train_batch_size,
+            cache_uri=args.cache_uri,
+            profile_store=args.profile_store,
+            max_latency_ms=args.max_latency_ms,
+            sweep=args.sweep or bool(args.search_space),
+            search_space=load_search_space(args.search_space),
+            sweep_candidates=args.sweep_candidates,
+            algorithms=args.algorithms,
+            checkpoint_uri=args.checkpoint_uri,
+            checkpoint_interval=args.checkpoint_interval
         )
         
         print("\n=== Pipeline Run Summary ===")
-        print(f"Run ID: {run_result.id}")
+        print(f"Run ID: {run_result.run_id}")
         print(f"Experiment: {args.experiment_name}")
-        print(f"Algorithm: {args.algorithm}")
+        print(f"Algorithm: {', '.join(args.algorithms) if args.algorithms else args.algorithm}")
         print(f"Data file: {args.data_file}")
         print(f"Bucket: {args.bucket_name}")
         print(f"Test size: {args.test_size}")
         print(f"Accuracy threshold: {args.accuracy_threshold}")
+        if args.max_latency_ms:
+            print(f"Max p95 latency: {args.max_latency_ms} ms")
         
     except Exception as e:
         print(f"Error running pipeline: {str(e)}")
@@ -0,0 +1,120 @@
+"""
+Content-addressed step cache for the sample ML pipeline components
+
+A StepCache keys a step's outputs by a SHA-256 digest of the step's parameters
+and the contents of its input artifacts. The outputs are stored under
+``<cache_uri>/<step>/<digest>/`` in a gs:// prefix or a local directory, so a
+rerun on unchanged data restores them instead of recomputing. An entry's
+result.json is written last, so its presence marks the entry as complete.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+def list_files(path):
+    """Relative paths of the files under a directory, or [''] for a single file"""
+    if os.path.isfile(path):
+        return ['']
+    return sorted(
+        os.path.relpath(os.path.join(root, name), path)
+        for root, _, names in os.walk(path) for name in names
+    )
+
+def content_digest(params, input_paths):
+    """SHA-256 hex digest of a JSON-serializable dict and the contents of files or directories"""
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+    for input_path in input_paths:
+        for rel in list_files(input_path):
+            digest.update(rel.encode())
+            with open(os.path.join(input_path, rel) if rel else input_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+    return digest.hexdigest()
+
+class StepCache:
+    """
+    Outputs of one step, stored under a digest of its parameters and inputs
+
+    Args:
+        cache_uri: gs://bucket/prefix or a local directory
+        step: Step name, part of the digest and the storage path
+        params: The step's parameters (JSON-serializable)
+        input_paths: Local paths of the step's input artifacts
+    """
+
+    def __init__(self, cache_uri, step, params, input_paths):
+        self.key = content_digest(dict(params, step=step), input_paths)
+        self.bucket = None
+        if cache_uri.startswith('gs://'):
+            from gcs_transfer import get_client
+
+            cache_bucket, _, prefix = cache_uri[len('gs://'):].partition('/')
+            self.client = get_client()
+            self.bucket = self.client.bucket(cache_bucket)
+            self.root = '/'.join(part for part in [prefix.strip('/'), step, self.key] if part)
+        else:
+            self.root = os.path.join(cache_uri, step, self.key)
+
+    def _remote(self, name, rel):
+        if self.bucket is not None:
+            return '/'.join(part for part in [self.root, name, rel] if part)
+        return os.path.join(self.root, name, rel) if rel else os.path.join(self.root, name)
+
+    def _stored_files(self, name):
+        if self.bucket is None:
+            return list_files(self._remote(name, ''))
+        prefix = self._remote(name, '')
+        return [
+            blob.name[len(prefix):].lstrip('/')
+            for blob in self.client.list_blobs(self.bucket.name, prefix=prefix)
+            if blob.name == prefix or blob.name.startswith(prefix + '/')
+        ]
+
+    def _download(self, name, local_path):
+        for rel in self._stored_files(name):
+            local_file = os.path.join(local_path, rel) if rel else local_path
+            os.makedirs(os.path.dirname(local_file) or '.', exist_ok=True)
+            if self.bucket is not None:
+                self.bucket.blob(self._remote(name, rel)).download_to_filename(local_file)
+            else:
+                shutil.copyfile(self._remote(name, rel), local_file)
+
+    def _upload(self, name, local_path):
+        for rel in list_files(local_path):
+            local_file = os.path.join(local_path, rel) if rel else local_path
+            if self.bucket is not None:
+                self.bucket.blob(self._remote(name, rel)).upload_from_filename(local_file)
+            else:
+                os.makedirs(os.path.dirname(self._remote(name, rel)), exist_ok=True)
+                shutil.copyfile(local_file, self._remote(name, rel))
+
+    def load(self, outputs):
+        """
+        Restore a complete entry into the given output paths
+
+        Args:
+            outputs: Mapping of output name to local artifact path
+
+        Returns:
+            The stored result dict, or None on a cache miss
+        """
+        if not self._stored_files('result.json'):
+            return None
+        for name, local_path in outputs.items():
+            self._download(name, local_path)
+        with tempfile.TemporaryDirectory() as tmp:
+            self._download('result.json', os.path.join(tmp, 'result.json'))
+            with open(os.path.join(tmp, 'result.json')) as f:
+                return json.load(f)
+
+    def save(self, outputs, result):
+        """Store the output artifacts, then the step's result dict"""
+        for name, local_path in outputs.items():
+            self._upload(name, local_path)
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'result.json'), 'w') as f:
+                json.dump(result, f)
+            self._upload('result.json', os.path.join(tmp, 'result.json'))